@@ -13,6 +13,7 @@ import json
 import logging
 import os
 import socket
+import struct
 import threading
 import time
 from typing import Dict, Optional, Tuple, Any
@@ -62,11 +63,14 @@ from struttura.sponsor import show_sponsor_dialog
 from struttura.version import get_version
 from struttura.view_log import show_log_viewer
 
-from common.protocol import Message, MessageType
+from common.protocol import Message, MessageType, MOUSE_MOVE_STRUCT, MOUSE_EVENT_STRUCT
 from common.security import SecurityManager
 from common.file_transfer import FileTransfer
 from common.utils import setup_logger
 
+# Message header: type and payload length, both big-endian uint32
+_HDR = struct.Struct('>II')
+
 # Configure logging
 import os
 from pathlib import Path
@@ -669,8 +673,7 @@ class RemoteControlClient(QMainWindow):
                         continue
                         
                     # Parse message type and data length
-                    msg_type = int.from_bytes(header[0:4], byteorder='big')
-                    data_len = int.from_bytes(header[4:8], byteorder='big')
+                    msg_type, data_len = _HDR.unpack_from(header)
                     
                     if data_len > 10 * 1024 * 1024:  # 10MB max
                         logger.error(f"Message too large: {data_len} bytes")
@@ -1236,16 +1239,9 @@ class RemoteControlClient(QMainWindow):
         elif event.button() == Qt.MouseButton.MiddleButton:
             button = 1
         
-        # Create a dictionary for the mouse event
-        mouse_event = {
-            'x': pos.x(),
-            'y': pos.y(),
-            'button': button,
-            'pressed': True
-        }
-        
-        # Convert to bytes and send
-        self.send_message(MessageType.MOUSE_CLICK, json.dumps(mouse_event).encode('utf-8'))
+        # Send x, y, button, pressed as a fixed-size binary event
+        self.send_message(MessageType.MOUSE_CLICK,
+                          MOUSE_EVENT_STRUCT.pack(pos.x(), pos.y(), button, 1))
         
         # Start dragging
         self.dragging = True
@@ -1272,16 +1268,9 @@ class RemoteControlClient(QMainWindow):
         elif event.button() == Qt.MouseButton.MiddleButton:
             button = 1
         
-        # Create a dictionary for the mouse event
-        mouse_event = {
-            'x': pos.x(),
-            'y': pos.y(),
-            'button': button,
-            'pressed': False
-        }
-        
-        # Convert to bytes and send
-        self.send_message(MessageType.MOUSE_CLICK, json.dumps(mouse_event).encode('utf-8'))
+        # Send x, y, button, pressed as a fixed-size binary event
+        self.send_message(MessageType.MOUSE_CLICK,
+                          MOUSE_EVENT_STRUCT.pack(pos.x(), pos.y(), button, 0))
         
         # Stop dragging and clean up
         self.dragging = False
@@ -1305,16 +1294,8 @@ class RemoteControlClient(QMainWindow):
         
         # Send mouse move event
         if self.dragging and self.last_mouse_pos and (pos - self.last_mouse_pos).manhattanLength() > 1:
-            # Create a dictionary for the mouse move event
-            mouse_event = {
-                'x': pos.x(),
-                'y': pos.y(),
-                'dx': pos.x() - self.last_mouse_pos.x(),  # Delta X
-                'dy': pos.y() - self.last_mouse_pos.y()   # Delta Y
-            }
-            
-            # Convert to bytes and send
-            self.send_message(MessageType.MOUSE_MOVE, json.dumps(mouse_event).encode('utf-8'))
+            # Send the absolute position as a fixed-size binary event
+            self.send_message(MessageType.MOUSE_MOVE, MOUSE_MOVE_STRUCT.pack(pos.x(), pos.y()))
             self.last_mouse_pos = pos
         
         # Update selection rectangle if dragging
@@ -4,16 +4,20 @@ Handles file and directory operations between client and server.
 """
 import os
 import io
-import json
 import shutil
 import hashlib
 from pathlib import Path
 from typing import BinaryIO, Dict, List, Optional, Tuple, Union
 
+from common.utils import json_dumps, json_loads
+
 class FileTransfer:
     """Handles file transfer operations between client and server."""
     
     CHUNK_SIZE = 65536  # 64KB chunks for file transfer
+    # Largest GET_FILE reply; clients drop messages over 10MB, so bigger
+    # files are fetched as several offset/length ranges
+    GET_FILE_CHUNK_SIZE = 8 * 1024 * 1024
     
     @staticmethod
     def calculate_file_hash(file_path: Union[str, Path], algorithm: str = 'sha256') -> str:
@@ -193,7 +197,7 @@ class FileTransfer:
         Returns:
             Serialized bytes
         """
-        return json.dumps(file_list).encode('utf-8')
+        return json_dumps(file_list)
     
     @classmethod
     def deserialize_file_list(cls, data: bytes) -> List[Dict]:
@@ -205,7 +209,7 @@ class FileTransfer:
         Returns:
             List of file information dictionaries
         """
-        return json.loads(data.decode('utf-8'))
+        return json_loads(data)
 
 # File transfer protocol messages
 class FileTransferMessage:
@@ -228,9 +232,15 @@ class FileTransferMessage:
         return {'type': FileTransferMessage.Type.LIST_DIR, 'path': path}
     
     @staticmethod
-    def create_get_file(path: str, offset: int = 0) -> Dict:
-        """Create a get file message."""
-        return {'type': FileTransferMessage.Type.GET_FILE, 'path': path, 'offset': offset}
+    def create_get_file(path: str, offset: int = 0,
+                        length: int = FileTransfer.GET_FILE_CHUNK_SIZE) -> Dict:
+        """Create a get file message for up to length bytes starting at offset.
+
+        The reply is capped at FileTransfer.GET_FILE_CHUNK_SIZE; a reply
+        shorter than requested means the end of the file was reached.
+        """
+        return {'type': FileTransferMessage.Type.GET_FILE, 'path': path,
+                'offset': offset, 'length': length}
     
     @staticmethod
     def create_put_file(path: str, size: int, mode: str = 'wb') -> Dict:
@@ -270,9 +280,9 @@ class FileTransferMessage:
     @staticmethod
     def serialize(message: Dict) -> bytes:
         """Serialize a message to bytes."""
-        return json.dumps(message).encode('utf-8')
+        return json_dumps(message)
     
     @staticmethod
     def deserialize(data: bytes) -> Dict:
         """Deserialize a message from bytes."""
-        return json.loads(data.decode('utf-8'))
+        return json_loads(data)
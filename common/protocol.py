@@ -3,11 +3,12 @@ Remote Control Protocol
 
 Defines the communication protocol between client and server.
 """
-import json
 import struct
 from enum import Enum, auto
 from typing import Any, Dict, Tuple, Union
 
+from common.utils import json_dumps, json_loads
+
 class MessageType(Enum):
     """Message types for client-server communication."""
     AUTH = 0
@@ -26,6 +27,13 @@ class MessageType(Enum):
     PING = 13        # Keep-alive ping
     PONG = 14        # Keep-alive pong response
 
+# Message header: type and data length, both big-endian uint32
+_HEADER = struct.Struct('>II')
+
+# Fixed-size input event payloads
+MOUSE_MOVE_STRUCT = struct.Struct('>ii')     # x, y
+MOUSE_EVENT_STRUCT = struct.Struct('>iiBB')  # x, y, button, pressed
+
 class Message:
     """Message class for client-server communication."""
     HEADER_SIZE = 8  # 4 bytes for message type, 4 bytes for data length
@@ -36,9 +44,7 @@ class Message:
     
     def serialize(self) -> bytes:
         """Serialize message to bytes for transmission."""
-        msg_type = self.type.value.to_bytes(4, byteorder='big')
-        data_len = len(self.data).to_bytes(4, byteorder='big')
-        return msg_type + data_len + self.data
+        return _HEADER.pack(self.type.value, len(self.data)) + self.data
     
     @classmethod
     def deserialize(cls, data: bytes) -> 'Message':
@@ -46,8 +52,8 @@ class Message:
         if len(data) < cls.HEADER_SIZE:
             raise ValueError("Invalid message format: message too short")
         
-        msg_type = MessageType(int.from_bytes(data[:4], byteorder='big'))
-        data_len = int.from_bytes(data[4:8], byteorder='big')
+        type_value, data_len = _HEADER.unpack_from(data)
+        msg_type = MessageType(type_value)
         
         if len(data) < cls.HEADER_SIZE + data_len:
             raise ValueError("Incomplete message: data length mismatch")
@@ -63,15 +69,15 @@ class AuthMessage:
     
     def to_bytes(self) -> bytes:
         """Convert to bytes for transmission."""
-        return json.dumps({
+        return json_dumps({
             'username': self.username,
             'password': self.password
-        }).encode('utf-8')
+        })
     
     @classmethod
     def from_bytes(cls, data: bytes) -> 'AuthMessage':
         """Create from received bytes."""
-        data_dict = json.loads(data.decode('utf-8'))
+        data_dict = json_loads(data)
         return cls(data_dict['username'], data_dict['password'])
 
 class MouseEvent:
@@ -84,12 +90,12 @@ class MouseEvent:
     
     def to_bytes(self) -> bytes:
         """Convert to bytes for transmission."""
-        return struct.pack('!hhBB', self.x, self.y, self.button, int(self.pressed))
+        return MOUSE_EVENT_STRUCT.pack(self.x, self.y, self.button, int(self.pressed))
     
     @classmethod
     def from_bytes(cls, data: bytes) -> 'MouseEvent':
         """Create from received bytes."""
-        x, y, button, pressed = struct.unpack('!hhBB', data)
+        x, y, button, pressed = MOUSE_EVENT_STRUCT.unpack_from(data)
         return cls(x, y, button, bool(pressed))
 
 class KeyEvent:
@@ -100,13 +106,13 @@ class KeyEvent:
     
     def to_bytes(self) -> bytes:
         """Convert to bytes for transmission."""
-        return json.dumps({
+        return json_dumps({
             'key': self.key,
             'pressed': self.pressed
-        }).encode('utf-8')
+        })
     
     @classmethod
     def from_bytes(cls, data: bytes) -> 'KeyEvent':
         """Create from received bytes."""
-        data_dict = json.loads(data.decode('utf-8'))
+        data_dict = json_loads(data)
         return cls(data_dict['key'], data_dict['pressed'])
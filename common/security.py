@@ -4,13 +4,14 @@ Security module for handling encryption, decryption, and secure communication.
 import os
 import base64
 import hashlib
-import json
 from typing import Tuple, Optional
 
 from cryptography.fernet import Fernet, InvalidToken
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 
+from common.utils import json_dumps, json_loads
+
 class SecurityManager:
     """Handles encryption, decryption, and secure communication."""
     
@@ -96,11 +97,11 @@ class SecurityManager:
     
     def encrypt_message(self, message: dict) -> bytes:
         """Encrypt a message dictionary."""
-        return self.encrypt(json.dumps(message).encode('utf-8'))
+        return self.encrypt(json_dumps(message))
     
     def decrypt_message(self, encrypted_data: bytes) -> dict:
         """Decrypt data to a message dictionary."""
-        return json.loads(self.decrypt(encrypted_data).decode('utf-8'))
+        return json_loads(self.decrypt(encrypted_data))
 
 # Utility functions
 def generate_rsa_keypair() -> Tuple[str, str]:
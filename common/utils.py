@@ -1,10 +1,17 @@
 """
 Common utility functions for the remote control application.
 """
+import json
 import logging
 import sys
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 def setup_logger(name: str, log_file: Optional[str] = None, level: int = logging.INFO) -> logging.Logger:
     """
@@ -43,6 +50,37 @@ def setup_logger(name: str, log_file: Optional[str] = None, level: int = logging
     
     return logger
 
+def json_dumps(obj: Any) -> bytes:
+    """
+    Serialize an object to UTF-8 JSON bytes (orjson when installed).
+    
+    Args:
+        obj: JSON-serializable object
+        
+    Returns:
+        bytes: Encoded JSON
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode('utf-8')
+
+def json_loads(data: Any) -> Any:
+    """
+    Parse UTF-8 JSON from bytes, bytearray or memoryview (orjson when installed).
+    
+    Args:
+        data: Encoded JSON
+        
+    Returns:
+        Decoded object
+        
+    Raises:
+        ValueError: If data is not valid JSON
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(bytes(data))
+
 def get_project_root() -> Path:
     """
     Get the project root directory.
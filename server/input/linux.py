@@ -42,6 +42,12 @@ XK_F10 = 0xffc7
 XK_F11 = 0xffc8
 XK_F12 = 0xffc9
 
+# Characters that need Shift held on a US layout
+SHIFTED_CHARS = frozenset('~!@#$%^&*()_+{}|:"<>?')
+
+# Compiled strings kept per controller before the cache is reset
+COMPILE_CACHE_SIZE = 128
+
 class LinuxInputController:
     """Linux input simulation using X11."""
     
@@ -58,6 +64,12 @@ class LinuxInputController:
         self.keysym_to_keycode = {}
         self.keycode_to_keysym = {}
         self._init_key_mapping()
+        
+        # (timestamp, keymap) of the last query_keymap round trip
+        self._keymap_cache = (0.0, None)
+        
+        # Compiled keystroke scripts per string, see _compile()
+        self._compiled = {}
     
     def _init_key_mapping(self):
         """Initialize the keycode to keysym mapping."""
@@ -127,11 +139,24 @@ class LinuxInputController:
         
         self.display.sync()
     
-    def key_tap(self, key):
-        """Simulate a key tap (press and release)."""
-        self.key_press(key, True)
-        time.sleep(0.01)  # Small delay between press and release
-        self.key_press(key, False)
+    def key_tap(self, key, press_hold_ms=0):
+        """Simulate a key tap (press and release).
+        
+        Both events are queued and sent with a single flush. Pass
+        press_hold_ms for the rare receiver that needs a gap between them.
+        """
+        if isinstance(key, str):
+            keysym = XK.string_to_keysym(key)
+        else:
+            keysym = key
+        keycode = self.display.keysym_to_keycode(keysym)
+        
+        self.display.xtest_fake_input(X.KeyPress, keycode)
+        if press_hold_ms:
+            self.display.flush()
+            time.sleep(press_hold_ms / 1000.0)
+        self.display.xtest_fake_input(X.KeyRelease, keycode)
+        self.display.flush()
     
     def is_key_pressed(self, key):
         """Check if a key is currently pressed."""
@@ -142,31 +167,60 @@ class LinuxInputController:
         
         keycode = self.display.keysym_to_keycode(keysym)
         
-        # Query the keyboard state
-        keys = self.display.query_pointer(self.root).child.query_keymap()
+        # Query the keyboard state, reusing a very recent keymap so a burst
+        # of checks for several keys costs a single round trip
+        now = time.monotonic()
+        if now - self._keymap_cache[0] > 0.001:
+            self._keymap_cache = (now, self.display.query_keymap())
+        keys = self._keymap_cache[1]
         return bool(keys[keycode // 8] & (1 << (keycode % 8)))
     
-    def type_text(self, text):
-        """Type the specified text."""
+    def _compile(self, text):
+        """Compile text into a tuple of (event_type, keycode) XTest events.
+        
+        Keysym lookups, Shift wrapping and the return/tab special cases are
+        resolved once per string, so repeated strings replay straight from
+        the cache.
+        """
+        events = self._compiled.get(text)
+        if events is None:
+            if len(self._compiled) >= COMPILE_CACHE_SIZE:
+                self._compiled.clear()
+            events = self._compiled[text] = self._compile_events(text)
+        return events
+    
+    def _compile_events(self, text):
+        """Build the XTest events for text; see _compile()."""
+        keysym_to_keycode = self.display.keysym_to_keycode
+        shift = keysym_to_keycode(XK_Shift_L)
+        events = []
+        
         for char in text:
             if char == '\n':
-                self.key_tap(XK_Return)
+                keysym = XK_Return
             elif char == '\t':
-                self.key_tap(XK_Tab)
+                keysym = XK_Tab
             else:
-                # Handle uppercase letters and symbols with shift
-                if char.isupper() or (not char.isalnum() and char in '~!@#$%^&*()_+{}|:"<>?'):
-                    self.key_press(XK_Shift_L, True)
-                
-                # Send the key press and release
-                self.key_tap(char)
-                
-                # Release shift if it was pressed
-                if char.isupper() or (not char.isalnum() and char in '~!@#$%^&*()_+{}|:"<>?'):
-                    self.key_press(XK_Shift_L, False)
+                keysym = XK.string_to_keysym(char)
+            keycode = keysym_to_keycode(keysym)
             
-            # Small delay between keystrokes
-            time.sleep(0.01)
+            # Handle uppercase letters and symbols with shift
+            shifted = char.isupper() or char in SHIFTED_CHARS
+            if shifted:
+                events.append((X.KeyPress, shift))
+            events.append((X.KeyPress, keycode))
+            events.append((X.KeyRelease, keycode))
+            if shifted:
+                events.append((X.KeyRelease, shift))
+        
+        return tuple(events)
+    
+    def type_text(self, text):
+        """Type the specified text."""
+        xfi = self.display.xtest_fake_input
+        for etype, detail in self._compile(text):
+            xfi(etype, detail)
+        self.display.flush()
     
     def get_mouse_position(self):
         """Get the current mouse position."""
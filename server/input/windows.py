@@ -1,10 +1,14 @@
 """
 Windows-specific input simulation.
 """
+import array
 import ctypes
 import time
 from ctypes import wintypes
 
+from server.platform_local.windows.sendinput import (
+    INPUT, INPUT_KEYBOARD, KEYBDINPUT, ULONG_PTR, SendInput)
+
 # Constants for mouse input
 MOUSEEVENTF_MOVE = 0x0001
 MOUSEEVENTF_LEFTDOWN = 0x0002
@@ -87,6 +91,21 @@ VK_F10 = 0x79
 VK_F11 = 0x7A
 VK_F12 = 0x7B
 
+# Lock and right-hand modifier keys
+VK_NUMLOCK = 0x90
+VK_RCONTROL = 0xA3
+VK_RMENU = 0xA5  # Right Alt key
+
+# Keys that need KEYEVENTF_EXTENDEDKEY (right alt/ctrl/numlock, etc.),
+# as a 256-entry lookup table indexed by virtual key code
+_EXTENDED_KEYS = (
+    VK_RMENU, VK_RCONTROL, VK_INSERT, VK_DELETE,
+    VK_HOME, VK_END, VK_PRIOR, VK_NEXT,
+    VK_LEFT, VK_RIGHT, VK_UP, VK_DOWN,
+    VK_NUMLOCK, VK_RETURN, VK_DIVIDE
+)
+_EXTENDED_MASK = bytes(vk in _EXTENDED_KEYS for vk in range(256))
+
 # Key state masks for GetKeyState/GetAsyncKeyState
 KEY_PRESSED = 0x8000
 KEY_TOGGLED = 0x0001
@@ -100,14 +119,14 @@ user32.mouse_event.argtypes = [
     wintypes.DWORD,  # dx
     wintypes.DWORD,  # dy
     wintypes.DWORD,  # dwData
-    wintypes.ULONG_PTR  # dwExtraInfo
+    ULONG_PTR  # dwExtraInfo
 ]
 
 user32.keybd_event.argtypes = [
     wintypes.BYTE,   # bVk
     wintypes.BYTE,   # bScan
     wintypes.DWORD,  # dwFlags
-    wintypes.ULONG_PTR  # dwExtraInfo
+    ULONG_PTR  # dwExtraInfo
 ]
 
 user32.GetKeyState.argtypes = [wintypes.INT]
@@ -126,6 +145,8 @@ class WindowsInputController:
         self.screen_width = user32.GetSystemMetrics(0)
         self.screen_height = user32.GetSystemMetrics(1)
         self.key_states = {}
+        # Scan codes for every virtual key, resolved once instead of per press
+        self._scan = array.array('H', [user32.MapVirtualKeyW(vk, 0) for vk in range(256)])
     
     def move_mouse(self, x, y):
         """Move the mouse to the specified coordinates."""
@@ -158,22 +179,19 @@ class WindowsInputController:
         if dx != 0:
             user32.mouse_event(MOUSEEVENTF_HWHEEL, 0, 0, dx * 120, 0)
     
-    def key_press(self, key, pressed=True):
-        """Simulate a key press or release."""
+    def _key_event(self, key, pressed):
+        """Build the (vk, scan_code, flags) triple for a key press or release."""
         if not isinstance(key, int):
             # Convert character to virtual key code
             key = ord(key.upper())
         
-        # Check if this is an extended key (right alt/ctrl/numlock, etc.)
-        extended = key in [
-            VK_RMENU, VK_RCONTROL, VK_INSERT, VK_DELETE,
-            VK_HOME, VK_END, VK_PRIOR, VK_NEXT,
-            VK_LEFT, VK_RIGHT, VK_UP, VK_DOWN,
-            VK_NUMLOCK, VK_RETURN, VK_DIVIDE
-        ]
-        
-        # Get the scan code
-        scan_code = user32.MapVirtualKeyW(key, 0)
+        # Look up the scan code and extended-key flag
+        if key < 256:
+            scan_code = self._scan[key]
+            extended = _EXTENDED_MASK[key]
+        else:
+            scan_code = user32.MapVirtualKeyW(key, 0)
+            extended = False
         
         # Set the extended key flag if needed
         flags = 0
@@ -182,14 +200,33 @@ class WindowsInputController:
         if not pressed:
             flags |= KEYEVENTF_KEYUP
         
+        return key, scan_code, flags
+    
+    def key_press(self, key, pressed=True):
+        """Simulate a key press or release."""
+        key, scan_code, flags = self._key_event(key, pressed)
+        
         # Send the key event
         user32.keybd_event(key, scan_code, flags, 0)
     
-    def key_tap(self, key):
-        """Simulate a key tap (press and release)."""
-        self.key_press(key, True)
-        time.sleep(0.01)  # Small delay between press and release
-        self.key_press(key, False)
+    def key_tap(self, key, press_hold_ms=0):
+        """Simulate a key tap (press and release).
+        
+        Press and release are injected atomically with one SendInput call.
+        Pass press_hold_ms for the rare receiver that needs a gap between them.
+        """
+        if press_hold_ms:
+            self.key_press(key, True)
+            time.sleep(press_hold_ms / 1000.0)
+            self.key_press(key, False)
+            return
+        
+        inputs = (INPUT * 2)()
+        for event, pressed in zip(inputs, (True, False)):
+            vk, scan_code, flags = self._key_event(key, pressed)
+            event.type = INPUT_KEYBOARD
+            event.ki = KEYBDINPUT(vk, scan_code, flags, 0, 0)
+        SendInput(2, inputs, ctypes.sizeof(INPUT))
     
     def is_key_pressed(self, key):
         """Check if a key is currently pressed."""
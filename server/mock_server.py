@@ -2,41 +2,145 @@
 Mock server for testing the remote control client.
 This simulates the server behavior for testing purposes.
 """
+import os
+import selectors
 import socket
-import json
+import struct
+import orjson
 import time
 import threading
 import queue
-from queue import Queue
 import random
-import base64
 import psutil
 import platform
 import subprocess
+import ctypes
+import win32api
 import win32clipboard
-from wand.image import Image
-from wand.drawing import Drawing
-from wand.color import Color
+import win32con
+import win32gui
+from PIL import Image, ImageDraw, ImageFont
 import io
 import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Any, Optional, List, Tuple
+from typing import Dict, Any, Deque, Optional, List, Tuple
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+# Posted to clipboard format listeners when the clipboard contents change
+WM_CLIPBOARDUPDATE = 0x031D
+
+# Wire format: [length:4][kind:1][payload], length counts the payload only
+FRAME_JSON = 0
+FRAME_BINARY = 1
+FRAME_MSGPACK = 2
+FRAME_HEADER = struct.Struct('>IB')
+MAX_FRAME_SIZE = 10 * 1024 * 1024  # 10MB max message size
+
+# Per-connection receive buffer; grown only for frames that do not fit
+RECV_BUFFER_SIZE = 65536
+
+
+def _parse_cpu_list(spec: str) -> set:
+    """Parse a Linux-style CPU list such as "0-3,8,10-11"."""
+    cpus = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            first, last = part.split('-', 1)
+            cpus.update(range(int(first), int(last) + 1))
+        else:
+            cpus.add(int(part))
+    return cpus
+
+
+def _control_plane_cpus() -> Optional[set]:
+    """Return the CPUs the control-plane threads should be pinned to.
+    
+    REMOTE_CONTROL_CPUS takes an explicit CPU list (e.g. to match where
+    irqbalance put the NIC queues). Otherwise REMOTE_CONTROL_NIC names an
+    interface whose NUMA node's CPUs are used. Returns None when neither is
+    set or the topology cannot be read, leaving scheduling to the OS.
+    """
+    spec = os.environ.get('REMOTE_CONTROL_CPUS')
+    if spec:
+        return _parse_cpu_list(spec) or None
+    
+    iface = os.environ.get('REMOTE_CONTROL_NIC')
+    if not iface:
+        return None
+    try:
+        with open(f'/sys/class/net/{iface}/device/numa_node') as f:
+            node = int(f.read())
+        if node < 0:
+            return None
+        with open(f'/sys/devices/system/node/node{node}/cpulist') as f:
+            return _parse_cpu_list(f.read()) or None
+    except (OSError, ValueError) as e:
+        print(f"Could not read NUMA node for {iface}: {e}")
+        return None
+
 
 class MockServer:
-    def __init__(self, host='0.0.0.0', port=5000):
+    def __init__(self, host='0.0.0.0', port=5000, verbose=True):
         self.host = host
         self.port = port
+        self.verbose = verbose  # Log every input event (disable for perf runs)
+        self._cpu_affinity = _control_plane_cpus()
         self.clients = {}  # type: Dict[str, Dict[str, Any]]
+        self._socket_to_id = {}  # type: Dict[socket.socket, str]
+        # Immutable (client_id, socket) pairs, replaced wholesale on connect and
+        # disconnect so broadcasts can iterate it without locking or copying
+        self._clients_snapshot = ()  # type: Tuple[Tuple[str, socket.socket], ...]
+        # Clients that negotiated msgpack for control frames via 'set_encoding'
+        self._msgpack_sockets = set()  # type: set
+        # One lock per socket, held for a whole frame group: the encode pool,
+        # the command workers and the clipboard thread all write to clients
+        self._send_locks = {}  # type: Dict[socket.socket, threading.Lock]
+        self.clients_lock = threading.Lock()
         self.running = False
-        self.command_queue = Queue()
+        # One command queue per worker; each client is pinned to a single
+        # worker so its commands stay in order without a shared bottleneck
+        self._num_workers = os.cpu_count() or 1
+        self._command_queues = [queue.SimpleQueue() for _ in range(self._num_workers)]
+        # Newest pointer position per client; mouse moves are coalesced here
+        # instead of queued, and drained at a fixed rate
+        self._latest_mouse = {}  # type: Dict[str, Tuple[int, int, float]]
+        self._mouse_lock = threading.Lock()
+        self.mouse_drain_interval = 1 / 120  # seconds
+        self._encode_pool = ThreadPoolExecutor(max_workers=os.cpu_count(),
+                                               thread_name_prefix='screenshot-encode')
         self.screen_width = 1920
         self.screen_height = 1080
-        self.chat_history = []  # type: List[Dict[str, str]]
+        self.chat_history = deque(maxlen=100)  # type: Deque[Dict[str, str]]
+        # Bumped on every chat message; keys the cached greeting
+        self._chat_version = 0
+        self._greeting_cache = None  # type: Optional[Tuple[Tuple[int, str], bytes]]
         self.clipboard_content = ""
         self.last_clipboard_update = 0.0
         self.clipboard_lock = threading.Lock()
+        self._clipboard_thread_id = None
         self.system_stats_interval = 5.0  # seconds
         self.last_system_stats = {}
+        # Static stats are read once; the first cpu_percent call primes the
+        # counter so later non-blocking calls return the delta since the last one
+        self._boot_time = psutil.boot_time()
+        psutil.cpu_percent(interval=None)
+        # Static screenshot layout, computed once instead of per frame
+        self._hostname = platform.node()
+        self._footer_top = self.screen_height - 25
+        self._footer_text_y = self.screen_height - 20
+        self._chat_bottom = self.screen_height - 50
+        self._font = ImageFont.load_default(size=16)
+        self._screenshot_bg = self._build_screenshot_background()
         self._init_system_monitoring()
         
     def _init_system_monitoring(self):
@@ -48,16 +152,55 @@ class MockServer:
         self.clipboard_thread = threading.Thread(target=self._monitor_clipboard, daemon=True)
         self.clipboard_thread.start()
 
+    def _pin_current_thread(self):
+        """Pin the calling thread to the configured control-plane CPUs."""
+        if not self._cpu_affinity:
+            return
+        try:
+            if hasattr(os, 'sched_setaffinity'):
+                # On Linux pid 0 means the calling thread
+                os.sched_setaffinity(0, self._cpu_affinity)
+            else:
+                mask = 0
+                for cpu in self._cpu_affinity:
+                    mask |= 1 << cpu
+                kernel32 = ctypes.windll.kernel32
+                kernel32.GetCurrentThread.restype = ctypes.c_void_p
+                kernel32.SetThreadAffinityMask.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+                kernel32.SetThreadAffinityMask.restype = ctypes.c_size_t
+                if not kernel32.SetThreadAffinityMask(kernel32.GetCurrentThread(), mask):
+                    raise ctypes.WinError()
+        except OSError as e:
+            print(f"Error setting thread affinity: {e}")
+    
     def _update_system_stats(self):
         """Continuously update system statistics."""
+        self._pin_current_thread()
         while self.running:
             try:
+                mem = psutil.virtual_memory()
+                disk = psutil.disk_usage('/')
                 self.last_system_stats = {
-                    'cpu_percent': psutil.cpu_percent(interval=1),
-                    'memory': dict(psutil.virtual_memory()._asdict()),
-                    'disk_usage': dict(psutil.disk_usage('/')._asdict()),
-                    'boot_time': psutil.boot_time(),
-                    'users': [dict(user._asdict()) for user in psutil.users()],
+                    'cpu_percent': psutil.cpu_percent(interval=None),
+                    'memory': {
+                        'total': mem.total,
+                        'available': mem.available,
+                        'used': mem.used,
+                        'free': mem.free,
+                        'percent': mem.percent
+                    },
+                    'disk_usage': {
+                        'total': disk.total,
+                        'used': disk.used,
+                        'free': disk.free,
+                        'percent': disk.percent
+                    },
+                    'boot_time': self._boot_time,
+                    'users': [
+                        {'name': user.name, 'terminal': user.terminal, 'host': user.host,
+                         'started': user.started, 'pid': user.pid}
+                        for user in psutil.users()
+                    ],
                     'timestamp': time.time()
                 }
             except Exception as e:
@@ -67,15 +210,25 @@ class MockServer:
             time.sleep(self.system_stats_interval)
 
     def _monitor_clipboard(self):
-        """Monitor clipboard for changes and notify clients."""
+        """Monitor clipboard for changes and notify clients.
+        
+        Registers a message-only window as a clipboard format listener, so
+        the thread sleeps in the message pump until Windows posts
+        WM_CLIPBOARDUPDATE instead of polling the clipboard.
+        """
+        if not self.running:
+            return
+        self._pin_current_thread()
+        
         last_clipboard = ""
         
-        while self.running:
+        def on_clipboard_update(hwnd, msg, wparam, lparam):
+            nonlocal last_clipboard
             try:
                 win32clipboard.OpenClipboard()
                 try:
-                    if win32clipboard.IsClipboardFormatAvailable(win32clipboard.CF_TEXT):
-                        clipboard_data = win32clipboard.GetClipboardData()
+                    if win32clipboard.IsClipboardFormatAvailable(win32clipboard.CF_UNICODETEXT):
+                        clipboard_data = win32clipboard.GetClipboardData(win32clipboard.CF_UNICODETEXT)
                         if clipboard_data != last_clipboard and time.time() - self.last_clipboard_update > 1.0:
                             last_clipboard = clipboard_data
                             self.clipboard_content = clipboard_data
@@ -84,8 +237,31 @@ class MockServer:
                     win32clipboard.CloseClipboard()
             except Exception as e:
                 print(f"Error monitoring clipboard: {e}")
-            
-            time.sleep(0.5)
+            return 0
+        
+        try:
+            wc = win32gui.WNDCLASS()
+            wc.hInstance = win32api.GetModuleHandle(None)
+            wc.lpszClassName = 'MockServerClipboardListener'
+            wc.lpfnWndProc = {WM_CLIPBOARDUPDATE: on_clipboard_update}
+            class_atom = win32gui.RegisterClass(wc)
+            hwnd = win32gui.CreateWindowEx(
+                0, class_atom, None, 0, 0, 0, 0, 0,
+                win32con.HWND_MESSAGE, 0, wc.hInstance, None
+            )
+            if not ctypes.windll.user32.AddClipboardFormatListener(hwnd):
+                raise ctypes.WinError()
+            self._clipboard_thread_id = win32api.GetCurrentThreadId()
+        except Exception as e:
+            print(f"Error starting clipboard listener: {e}")
+            return
+        
+        try:
+            win32gui.PumpMessages()
+        finally:
+            ctypes.windll.user32.RemoveClipboardFormatListener(hwnd)
+            win32gui.DestroyWindow(hwnd)
+            win32gui.UnregisterClass(class_atom, wc.hInstance)
 
     def _broadcast_clipboard_update(self):
         """Broadcast clipboard update to all connected clients."""
@@ -99,16 +275,25 @@ class MockServer:
     def _broadcast(self, message: Dict[str, Any], client_socket: Optional[socket.socket] = None):
         """Broadcast a message to all connected clients or a specific client."""
         try:
-            data = json.dumps(message).encode('utf-8')
+            # Frame once per encoding and reuse the same buffers for every recipient
+            frames = {}
+            
+            def frame_for(sock):
+                kind = FRAME_MSGPACK if sock in self._msgpack_sockets else FRAME_JSON
+                if kind not in frames:
+                    data = self._encode_message(message, kind)
+                    frames[kind] = (FRAME_HEADER.pack(len(data), kind), data)
+                return frames[kind]
+            
             if client_socket:
-                client_socket.sendall(len(data).to_bytes(4, byteorder='big') + data)
+                self._send_buffers(client_socket, frame_for(client_socket))
             else:
-                for client in list(self.clients.values()):
+                for _, sock in self._clients_snapshot:
                     try:
-                        client['socket'].sendall(len(data).to_bytes(4, byteorder='big') + data)
+                        self._send_buffers(sock, frame_for(sock))
                     except Exception as e:
                         print(f"Error broadcasting to client: {e}")
-                        self._remove_client(client['socket'])
+                        self._remove_client(sock)
         except Exception as e:
             print(f"Error in broadcast: {e}")
 
@@ -122,36 +307,39 @@ class MockServer:
         
         print(f"Mock server started on {self.host}:{self.port}")
         
-        # Start the command processor in a separate thread
-        self.command_thread = threading.Thread(target=self._process_commands)
-        self.command_thread.daemon = True
-        self.command_thread.start()
+        # Start one command processor thread per worker queue
+        self.command_threads = []
+        for command_queue in self._command_queues:
+            command_thread = threading.Thread(target=self._process_commands, args=(command_queue,))
+            command_thread.daemon = True
+            command_thread.start()
+            self.command_threads.append(command_thread)
+        
+        # Start the mouse move drain thread
+        self.mouse_thread = threading.Thread(target=self._drain_mouse_moves, daemon=True)
+        self.mouse_thread.start()
         
         # Start system monitoring
         self._init_system_monitoring()
         
-        # Accept incoming connections
+        # Serve all connections from this thread
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self.server_socket, selectors.EVENT_READ)
         try:
             while self.running:
                 try:
-                    client_socket, addr = self.server_socket.accept()
-                    print(f"New connection from {addr}")
-                    client_id = f"{addr[0]}:{addr[1]}"
-                    self.clients[client_id] = {
-                        'socket': client_socket,
-                        'address': addr,
-                        'authenticated': False,
-                        'username': None
-                    }
-                    client_thread = threading.Thread(
-                        target=self._handle_client,
-                        args=(client_socket, addr, client_id)
-                    )
-                    client_thread.daemon = True
-                    client_thread.start()
+                    events = self._selector.select(timeout=1)
                 except OSError as e:
+                    # A socket was closed by another thread mid-select
                     if self.running:
-                        print(f"Error accepting connection: {e}")
+                        print(f"Error waiting for events: {e}")
+                    continue
+                
+                for key, _ in events:
+                    if key.fileobj is self.server_socket:
+                        self._accept_client()
+                    else:
+                        self._read_client(key.fileobj, key.data)
         except KeyboardInterrupt:
             self.stop()
     
@@ -160,57 +348,99 @@ class MockServer:
         self.running = False
         if hasattr(self, 'server_socket'):
             self.server_socket.close()
+        if hasattr(self, '_selector'):
+            self._selector.close()
+        self._encode_pool.shutdown(wait=False)
+        if self._clipboard_thread_id:
+            # End the clipboard listener's message pump
+            win32api.PostThreadMessage(self._clipboard_thread_id, win32con.WM_QUIT, 0, 0)
         print("Mock server stopped")
     
-    def _process_commands(self):
-        """Process commands from the queue."""
+    def _enqueue_command(self, client_id: str, command: Dict[str, Any]):
+        """Queue a command on the worker that owns this client."""
+        self._command_queues[hash(client_id) % self._num_workers].put(command)
+    
+    def _process_commands(self, command_queue: queue.SimpleQueue):
+        """Process commands from a worker queue."""
+        self._pin_current_thread()
         while self.running:
             try:
                 try:
-                    command = self.command_queue.get(timeout=1)
+                    command = command_queue.get(timeout=1)
                 except queue.Empty:
                     # Timeout occurred, just continue the loop
                     continue
                     
-                try:
-                    if command['type'] == 'screenshot':
-                        self._generate_screenshot(command['client_socket'])
-                    elif command['type'] == 'mouse_move':
-                        print(f"Mouse moved to ({command['x']}, {command['y']})")
-                    elif command['type'] == 'mouse_click':
-                        button = 'left' if command['button'] == 0 else 'right' if command['button'] == 1 else 'middle'
-                        action = 'pressed' if command['pressed'] else 'released'
-                        print(f"Mouse {button} button {action} at ({command['x']}, {command['y']})")
-                    elif command['type'] == 'key_press':
-                        action = 'pressed' if command['pressed'] else 'released'
-                        key = command.get('key', 0)
-                        key_str = chr(key) if 32 <= key <= 126 else f'0x{key:02X}'
-                        print(f"Key {key_str} {action}")
-                    elif command['type'] == 'file_upload':
-                        self._handle_file_upload(command['client_socket'], command.get('file_data', b''))
-                    elif command['type'] == 'file_download':
-                        self._handle_file_download(command['client_socket'], command.get('file_path', ''))
-                    elif command['type'] == 'chat_message':
-                        self._handle_chat_message(command)
-                    elif command['type'] == 'get_system_stats':
-                        self._send_system_stats(command['client_socket'])
-                    elif command['type'] == 'update_clipboard':
-                        self._handle_clipboard_update(command)
-                    else:
-                        print(f"Unknown command type: {command.get('type')}")
-                except KeyError as e:
-                    print(f"Missing required field in command: {e}. Command: {command}")
-                    traceback.print_exc()
-                except Exception as e:
-                    print(f"Error processing command {command.get('type')}: {str(e)}")
-                    traceback.print_exc()
-                
-                self.command_queue.task_done()
+                self._execute_command(command)
                 
             except Exception as e:
                 print(f"Error in command processor: {str(e)}")
                 traceback.print_exc()
     
+    def _execute_command(self, command: Dict[str, Any]):
+        """Run a single command on the current worker thread."""
+        try:
+            if command['type'] == 'frame':
+                # Raw control frame from the selector loop, decoded here so
+                # parsing never holds up reads on other connections
+                self._process_message(command['client_socket'], command['data'],
+                                      command['client_id'], command['kind'])
+            elif command['type'] == 'screenshot':
+                self._generate_screenshot(command['client_socket'])
+            elif command['type'] == 'mouse_click':
+                if self.verbose:
+                    button = 'left' if command['button'] == 0 else 'right' if command['button'] == 1 else 'middle'
+                    action = 'pressed' if command['pressed'] else 'released'
+                    print(f"Mouse {button} button {action} at ({command['x']}, {command['y']})")
+            elif command['type'] == 'key_press':
+                if self.verbose:
+                    action = 'pressed' if command['pressed'] else 'released'
+                    print(f"Key {self._format_key(command.get('key', 0))} {action}")
+            elif command['type'] == 'file_upload':
+                self._handle_file_upload(command['client_socket'], command.get('file_data', b''))
+            elif command['type'] == 'file_download':
+                self._handle_file_download(command['client_socket'], command.get('file_path', ''))
+            elif command['type'] == 'chat_message':
+                self._handle_chat_message(command)
+            elif command['type'] == 'get_system_stats':
+                self._send_system_stats(command['client_socket'])
+            elif command['type'] == 'update_clipboard':
+                self._handle_clipboard_update(command)
+            else:
+                print(f"Unknown command type: {command.get('type')}")
+        except KeyError as e:
+            print(f"Missing required field in command: {e}. Command: {command}")
+            traceback.print_exc()
+        except Exception as e:
+            print(f"Error processing command {command.get('type')}: {str(e)}")
+            traceback.print_exc()
+    
+    def _drain_mouse_moves(self):
+        """Apply only the newest pointer position per client at a fixed rate."""
+        while self.running:
+            time.sleep(self.mouse_drain_interval)
+            with self._mouse_lock:
+                if not self._latest_mouse:
+                    continue
+                latest, self._latest_mouse = self._latest_mouse, {}
+            
+            if self.verbose:
+                for x, y, _ in latest.values():
+                    print(f"Mouse moved to ({x}, {y})")
+    
+    @staticmethod
+    def _format_key(key) -> str:
+        """Format a key code (or key name) for logging."""
+        if isinstance(key, str):
+            return key
+        return chr(key) if 32 <= key <= 126 else f'0x{key:02X}'
+    
+    def _recent_chat(self, count: int) -> List[Dict[str, str]]:
+        """Return the last ``count`` chat messages as a list."""
+        # list() copies the deque in one C call, so appends from other
+        # threads cannot interrupt it the way a Python-level walk can
+        return list(self.chat_history)[-count:]
+    
     def _handle_chat_message(self, command: Dict[str, Any]):
         """Handle incoming chat message."""
         try:
@@ -220,9 +450,9 @@ class MockServer:
                 'message': command['message'],
                 'timestamp': time.time()
             }
+            # The deque's maxlen keeps only the last 100 messages
             self.chat_history.append(message)
-            # Keep only last 100 messages
-            self.chat_history = self.chat_history[-100:]
+            self._chat_version += 1
             # Broadcast to all clients
             self._broadcast(message)
         except Exception as e:
@@ -262,88 +492,249 @@ class MockServer:
             print(f"Error updating clipboard: {e}")
             traceback.print_exc()
     
+    def _send_buffers(self, client_socket: socket.socket, buffers):
+        """Send several buffers back to back without concatenating them.
+        
+        Uses a gathering sendmsg where the platform has one (not Windows)
+        and falls back to a single joined sendall otherwise. The socket's
+        send lock is held throughout, so a partial write is never followed
+        by another thread's frame.
+        """
+        lock = self._send_locks.get(client_socket)
+        if lock is None:
+            raise ConnectionError("Client is no longer connected")
+        with lock:
+            if not hasattr(client_socket, 'sendmsg'):
+                client_socket.sendall(b''.join(buffers))
+                return
+            
+            views = [memoryview(buf) for buf in buffers]
+            while views:
+                sent = client_socket.sendmsg(views)
+                # Drop fully sent buffers and trim a partially sent one
+                while views and sent >= len(views[0]):
+                    sent -= len(views.pop(0))
+                if views and sent:
+                    views[0] = views[0][sent:]
+    
+    @staticmethod
+    def _encode_message(message: Dict[str, Any], kind: int) -> bytes:
+        """Serialize a control message for the given frame kind."""
+        if kind == FRAME_MSGPACK:
+            return msgpack.packb(message, use_bin_type=True)
+        return orjson.dumps(message)
+    
+    def _control_kind(self, client_socket: socket.socket) -> int:
+        """Return the frame kind this client negotiated for control messages."""
+        return FRAME_MSGPACK if client_socket in self._msgpack_sockets else FRAME_JSON
+    
     def _send_to_client(self, client_socket: socket.socket, message: Dict[str, Any]):
         """Send a message to a specific client."""
         try:
-            data = json.dumps(message).encode('utf-8')
-            client_socket.sendall(len(data).to_bytes(4, byteorder='big') + data)
+            kind = self._control_kind(client_socket)
+            data = self._encode_message(message, kind)
+            self._send_buffers(client_socket, (FRAME_HEADER.pack(len(data), kind), data))
+        except Exception as e:
+            print(f"Error sending to client: {e}")
+            self._remove_client(client_socket)
+    
+    def _send_binary(self, client_socket: socket.socket, message: Dict[str, Any], payload: bytes):
+        """Send a JSON metadata message followed by a raw binary frame.
+        
+        Both frames go out under the socket's send lock, so another thread
+        writing to the same socket cannot slip a message in between them.
+        """
+        try:
+            message['size'] = len(payload)
+            kind = self._control_kind(client_socket)
+            data = self._encode_message(message, kind)
+            self._send_buffers(client_socket, (
+                FRAME_HEADER.pack(len(data), kind), data,
+                FRAME_HEADER.pack(len(payload), FRAME_BINARY), payload
+            ))
         except Exception as e:
             print(f"Error sending to client: {e}")
             self._remove_client(client_socket)
     
     def _remove_client(self, client_socket: socket.socket):
         """Remove a client from the clients dictionary."""
-        for client_id, client in list(self.clients.items()):
-            if client['socket'] == client_socket:
-                try:
-                    client_socket.close()
-                except:
-                    pass
-                self.clients.pop(client_id, None)
-                print(f"Client {client_id} disconnected")
-                break
+        with self.clients_lock:
+            client_id = self._socket_to_id.pop(client_socket, None)
+            if client_id is None:
+                return
+            self.clients.pop(client_id, None)
+            self._clients_snapshot = tuple(
+                (cid, sock) for cid, sock in self._clients_snapshot if sock is not client_socket)
+            self._msgpack_sockets.discard(client_socket)
+            self._send_locks.pop(client_socket, None)
+        
+        try:
+            self._selector.unregister(client_socket)
+        except (KeyError, ValueError):
+            pass
+        try:
+            client_socket.close()
+        except:
+            pass
+        print(f"Client {client_id} disconnected")
     
-    def _handle_client(self, client_socket, addr, client_id):
-        """Handle a client connection."""
+    def _accept_client(self):
+        """Accept a pending connection and register it with the selector."""
         try:
-            # Send initial connection info
-            self._send_to_client(client_socket, {
-                'type': 'connection_established',
-                'client_id': client_id,
-                'server_time': time.time(),
-                'chat_history': self.chat_history[-50:],  # Send last 50 messages
-                'clipboard': self.clipboard_content
-            })
-            
-            while self.running:
-                try:
-                    # Receive message length (first 4 bytes)
-                    msg_length_data = client_socket.recv(4)
-                    if not msg_length_data:
-                        break
-                        
-                    length = int.from_bytes(msg_length_data, byteorder='big')
-                    if length > 10 * 1024 * 1024:  # 10MB max message size
-                        print(f"Message too large: {length} bytes")
-                        break
-                    
-                    # Receive the actual message
-                    data = bytearray()
-                    while len(data) < length:
-                        packet = client_socket.recv(min(4096, length - len(data)))
-                        if not packet:
-                            break
-                        data.extend(packet)
-                    
-                    if not data:
-                        break
-                    
-                    # Process the received message
-                    self._process_message(client_socket, data, client_id)
-                    
-                except (ConnectionResetError, ConnectionAbortedError, BrokenPipeError):
-                    print(f"Client {client_id} disconnected")
-                    break
-                except Exception as e:
-                    print(f"Error receiving from client {client_id}: {e}")
-                    traceback.print_exc()
-                    break
-                    
+            client_socket, addr = self.server_socket.accept()
+        except OSError as e:
+            if self.running:
+                print(f"Error accepting connection: {e}")
+            return
+        
+        # Ship small control frames immediately instead of waiting on Nagle
+        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        print(f"New connection from {addr}")
+        client_id = f"{addr[0]}:{addr[1]}"
+        with self.clients_lock:
+            self.clients[client_id] = {
+                'socket': client_socket,
+                'address': addr,
+                'authenticated': False,
+                'username': None
+            }
+            self._socket_to_id[client_socket] = client_id
+            self._send_locks[client_socket] = threading.Lock()
+            self._clients_snapshot += ((client_id, client_socket),)
+        
+        # Per-connection read state: a reusable receive buffer and how many
+        # bytes of it hold data that has not been parsed yet
+        self._selector.register(client_socket, selectors.EVENT_READ, {
+            'client_id': client_id,
+            'view': memoryview(bytearray(RECV_BUFFER_SIZE)),
+            'filled': 0
+        })
+        
+        # Send initial connection info; the greeting is always JSON since no
+        # encoding has been negotiated yet
+        try:
+            data = self._greeting(client_id)
+            self._send_buffers(client_socket, (FRAME_HEADER.pack(len(data), FRAME_JSON), data))
         except Exception as e:
-            print(f"Error in client handler for {client_id}: {e}")
-            traceback.print_exc()
-        finally:
+            print(f"Error sending to client: {e}")
+            self._remove_client(client_socket)
+    
+    def _greeting(self, client_id: str) -> bytes:
+        """Serialize the connection_established message for a new client.
+        
+        The chat history, clipboard and encodings part is serialized once and
+        reused until the chat or clipboard changes; only the client id and
+        server time are encoded per connection.
+        """
+        key = (self._chat_version, self.clipboard_content)
+        cached = self._greeting_cache
+        if cached is None or cached[0] != key:
+            tail = orjson.dumps({
+                'chat_history': self._recent_chat(50),  # Send last 50 messages
+                'clipboard': key[1],
+                'encodings': ['json', 'msgpack'] if MSGPACK_AVAILABLE else ['json']
+            })
+            cached = self._greeting_cache = (key, tail)
+        
+        # Splice the per-client fields in front of the cached object's members
+        return b''.join((
+            b'{"type":"connection_established","client_id":', orjson.dumps(client_id),
+            b',"server_time":', orjson.dumps(time.time()), b',', cached[1][1:]
+        ))
+    
+    def _read_client(self, client_socket, state):
+        """Read whatever a readable client has sent and dispatch complete frames.
+        
+        Frames are parsed in place from the receive buffer; only a trailing
+        partial frame is moved to the front of it for the next read.
+        """
+        client_id = state['client_id']
+        view = state['view']
+        filled = state['filled']
+        try:
+            n = client_socket.recv_into(view[filled:])
+        except (ConnectionResetError, ConnectionAbortedError, BrokenPipeError):
+            n = 0
+        except OSError as e:
+            print(f"Error receiving from client {client_id}: {e}")
+            n = 0
+        if not n:
             self._remove_client(client_socket)
+            return
+        filled += n
+        
+        offset = 0
+        header_size = FRAME_HEADER.size
+        while filled - offset >= header_size:
+            length, kind = FRAME_HEADER.unpack_from(view, offset)
+            if length > MAX_FRAME_SIZE:
+                print(f"Message too large: {length} bytes")
+                self._remove_client(client_socket)
+                return
+            end = offset + header_size + length
+            if end > filled:
+                break
+            # The payload is copied once since it outlives this buffer on
+            # the worker's queue
+            data = bytes(view[offset + header_size:end])
+            offset = end
+            
+            # Hand the frame to the client's worker; binary frames are file
+            # uploads and skip control-message decoding entirely
+            if kind == FRAME_BINARY:
+                self._enqueue_command(client_id, {
+                    'type': 'file_upload',
+                    'client_socket': client_socket,
+                    'file_data': data
+                })
+            else:
+                self._enqueue_command(client_id, {
+                    'type': 'frame',
+                    'client_socket': client_socket,
+                    'client_id': client_id,
+                    'kind': kind,
+                    'data': data
+                })
+        
+        left = filled - offset
+        if left and offset:
+            view[:left] = view[offset:filled]
+        if left >= header_size:
+            needed = header_size + FRAME_HEADER.unpack_from(view)[0]
+            if needed > len(view):
+                # A frame larger than the buffer: read it into one that fits
+                grown = memoryview(bytearray(needed))
+                grown[:left] = view[:left]
+                state['view'] = grown
+        elif not left and len(view) > RECV_BUFFER_SIZE:
+            state['view'] = memoryview(bytearray(RECV_BUFFER_SIZE))
+        state['filled'] = left
     
-    def _process_message(self, client_socket, data, client_id):
+    def _process_message(self, client_socket, data, client_id, kind=FRAME_JSON):
         """Process a received message."""
         try:
-            # Try to decode as JSON first (for control messages)
+            # Decode the control message in the encoding the frame declares
             try:
-                message = json.loads(data.decode('utf-8'))
+                if kind == FRAME_MSGPACK and MSGPACK_AVAILABLE:
+                    message = msgpack.unpackb(data, raw=False)
+                else:
+                    message = orjson.loads(data)
                 message_type = message.get('type')
                 
-                if message_type == 'auth':
+                if message_type == 'set_encoding':
+                    # Switch this client's outgoing control frames; the reply
+                    # is already sent in the new encoding
+                    encoding = message.get('encoding')
+                    if encoding == 'msgpack' and MSGPACK_AVAILABLE:
+                        self._msgpack_sockets.add(client_socket)
+                    elif encoding == 'json':
+                        self._msgpack_sockets.discard(client_socket)
+                    self._send_to_client(client_socket, {
+                        'type': 'encoding_set',
+                        'encoding': 'msgpack' if client_socket in self._msgpack_sockets else 'json'
+                    })
+                    
+                elif message_type == 'auth':
                     # Simulate authentication
                     response = {
                         'type': 'auth_response',
@@ -354,24 +745,21 @@ class MockServer:
                     self._send_to_client(client_socket, response)
                     
                     # Update client info
-                    for cid, client in self.clients.items():
-                        if client['socket'] == client_socket:
-                            client['authenticated'] = True
-                            client['username'] = message.get('username', f'user_{cid}')
-                            break
+                    client = self.clients.get(client_id)
+                    if client is not None:
+                        client['authenticated'] = True
+                        client['username'] = message.get('username', f'user_{client_id}')
                     
                 elif message_type == 'screenshot_request':
-                    self.command_queue.put({'type': 'screenshot', 'client_socket': client_socket})
+                    self._execute_command({'type': 'screenshot', 'client_socket': client_socket})
                     
                 elif message_type == 'mouse_move':
-                    self.command_queue.put({
-                        'type': 'mouse_move',
-                        'x': message['x'],
-                        'y': message['y']
-                    })
+                    # Overwrite rather than queue; intermediate positions are dropped
+                    with self._mouse_lock:
+                        self._latest_mouse[client_id] = (message['x'], message['y'], time.time())
                     
                 elif message_type == 'mouse_click':
-                    self.command_queue.put({
+                    self._execute_command({
                         'type': 'mouse_click',
                         'button': message['button'],
                         'pressed': message['pressed'],
@@ -380,28 +768,28 @@ class MockServer:
                     })
                     
                 elif message_type == 'key_press':
-                    self.command_queue.put({
+                    self._execute_command({
                         'type': 'key_press',
                         'key': message['key'],
                         'pressed': message['pressed']
                     })
                     
                 elif message_type == 'file_upload':
-                    self.command_queue.put({
+                    self._execute_command({
                         'type': 'file_upload',
                         'client_socket': client_socket,
                         'file_data': message['data']
                     })
                     
                 elif message_type == 'file_download':
-                    self.command_queue.put({
+                    self._execute_command({
                         'type': 'file_download',
                         'client_socket': client_socket,
                         'file_path': message['path']
                     })
                     
                 elif message_type == 'chat_message':
-                    self.command_queue.put({
+                    self._execute_command({
                         'type': 'chat_message',
                         'client_socket': client_socket,
                         'sender': self.clients.get(client_id, {}).get('username', 'unknown'),
@@ -409,13 +797,13 @@ class MockServer:
                     })
                     
                 elif message_type == 'get_system_stats':
-                    self.command_queue.put({
+                    self._execute_command({
                         'type': 'get_system_stats',
                         'client_socket': client_socket
                     })
                     
                 elif message_type == 'update_clipboard':
-                    self.command_queue.put({
+                    self._execute_command({
                         'type': 'update_clipboard',
                         'client_socket': client_socket,
                         'content': message['content']
@@ -424,9 +812,9 @@ class MockServer:
                 else:
                     print(f"Unknown message type: {message_type}")
                     
-            except json.JSONDecodeError:
-                # Handle binary data (e.g., file chunks)
-                print(f"Received binary data: {len(data)} bytes")
+            except ValueError:
+                # orjson and msgpack decode errors both derive from ValueError
+                print(f"Invalid control frame from {client_id}: {len(data)} bytes")
                 
         except Exception as e:
             print(f"Error processing message from {client_id}: {e}")
@@ -441,99 +829,91 @@ class MockServer:
             print(f"Error sending message: {e}")
             traceback.print_exc()
     
+    def _build_screenshot_background(self) -> Image.Image:
+        """Render the static parts of the mock screenshot once.
+        
+        The header and footer bars, the grid and the fixed section title never
+        change, so they are drawn a single time and each screenshot starts
+        from a copy.
+        """
+        background = Image.new('RGB', (self.screen_width, self.screen_height), 'white')
+        draw = ImageDraw.Draw(background)
+        
+        # Add a subtle grid
+        for i in range(0, self.screen_width, 50):
+            draw.line([(i, 30), (i, self._footer_top)], fill='#f0f0f0')
+        for i in range(30, self._footer_top, 50):
+            draw.line([(0, i), (self.screen_width, i)], fill='#f0f0f0')
+        
+        # Header and footer bars
+        draw.rectangle([0, 0, self.screen_width, 30], fill='#2c3e50')
+        draw.rectangle([0, self._footer_top, self.screen_width, self.screen_height],
+                       fill='#2c3e50')
+        
+        # Fixed section title
+        draw.text((20, 40), "System Information:", fill='black', font=self._font, anchor='ls')
+        return background
+    
     def _generate_screenshot(self, client_socket):
-        """Generate a mock screenshot with system information using Wand."""
+        """Generate a mock screenshot with system information using Pillow."""
         try:
-            # Create a new image with Wand
-            with Image(width=self.screen_width, height=self.screen_height, 
-                      background=Color('white')) as img:
-                draw = Drawing()
-                
-                # Draw header
-                draw.fill_color = Color('#2c3e50')
-                draw.rectangle(left=0, top=0, 
-                            width=self.screen_width, height=30)
-                
-                # Draw header text
-                header = f"Remote Control Server - {time.ctime()}"
-                draw.fill_color = Color('white')
-                draw.font_size = 16
-                draw.text(10, 20, header)
+            # Collect every (x, y, color, text) line first, then render them in
+            # one pass; y is the text baseline
+            header = f"Remote Control Server - {time.ctime()}"
+            entries = [(10, 20, 'white', header)]
+            
+            # System information section (its title is part of the background)
+            y_offset = 65
+            
+            # Get system info
+            try:
+                # Reuse the monitor thread's sample instead of blocking 100 ms here
+                cpu_percent = self.last_system_stats.get('cpu_percent', 0.0)
+                mem = psutil.virtual_memory()
+                disk = psutil.disk_usage('/')
                 
-                # System information section
-                y_offset = 40
-                draw.fill_color = Color('black')
-                draw.text(20, y_offset, "System Information:")
-                y_offset += 25
+                # System info text
+                sys_info = [
+                    f"CPU: {cpu_percent}%",
+                    f"Memory: {mem.percent}% used ({mem.used//(1024*1024)}MB / {mem.total//(1024*1024)}MB)",
+                    f"Disk: {disk.percent}% used ({disk.used//(1024*1024)}MB / {disk.total//(1024*1024)}MB)",
+                    f"Connected Clients: {len([c for c in self.clients.values() if c.get('authenticated')])}"
+                ]
                 
-                # Get system info
-                try:
-                    cpu_percent = psutil.cpu_percent(interval=0.1)
-                    mem = psutil.virtual_memory()
-                    disk = psutil.disk_usage('/')
-                    
-                    # System info text
-                    sys_info = [
-                        f"CPU: {cpu_percent}%",
-                        f"Memory: {mem.percent}% used ({mem.used//(1024*1024)}MB / {mem.total//(1024*1024)}MB)",
-                        f"Disk: {disk.percent}% used ({disk.used//(1024*1024)}MB / {disk.total//(1024*1024)}MB)",
-                        f"Connected Clients: {len([c for c in self.clients.values() if c.get('authenticated')])}"
-                    ]
-                    
-                    for info in sys_info:
-                        draw.text(30, y_offset, info)
-                        y_offset += 20
-                        
-                except Exception as e:
-                    error_msg = "System information unavailable"
-                    draw.fill_color = Color('red')
-                    draw.text(30, y_offset, error_msg)
+                for info in sys_info:
+                    entries.append((30, y_offset, 'black', info))
                     y_offset += 20
                     
-                # Add recent chat messages
+            except Exception as e:
+                entries.append((30, y_offset, 'red', "System information unavailable"))
                 y_offset += 20
-                draw.fill_color = Color('black')
-                draw.text(20, y_offset, "Recent Chat:")
-                y_offset += 25
                 
-                for msg in self.chat_history[-5:]:  # Show last 5 messages
-                    msg_text = f"{msg.get('sender', 'Unknown')}: {msg.get('message', '')}"
-                    draw.fill_color = Color('#2c3e50')
-                    draw.text(30, y_offset, msg_text)
-                    y_offset += 20
-                    if y_offset > self.screen_height - 50:
-                        break
+            # Add recent chat messages
+            y_offset += 20
+            entries.append((20, y_offset, 'black', "Recent Chat:"))
+            y_offset += 25
             
-                # Add footer
-                footer = f"Server: {platform.node()} | {len(self.clients)} clients connected"
-                draw.fill_color = Color('#2c3e50')
-                draw.rectangle(left=0, top=self.screen_height-25, 
-                             width=self.screen_width, height=self.screen_height)
-                draw.fill_color = Color('white')
-                draw.text(10, self.screen_height-20, footer)
-                
-                # Add a subtle grid
-                draw.stroke_color = Color('#f0f0f0')
-                for i in range(0, self.screen_width, 50):
-                    draw.line((i, 30), (i, self.screen_height-25))
-                for i in range(30, self.screen_height-25, 50):
-                    draw.line((0, i), (self.screen_width, i))
-                
-                # Apply all drawings
-                draw(img)
-                
-                # Convert to JPEG and get binary data
-                img.format = 'jpeg'
-                img.compression_quality = 70
-                img_data = img.make_blob()
-                
-                # Send the screenshot
-                self._send_message(client_socket, 'screenshot', {
-                    'data': base64.b64encode(img_data).decode('utf-8'),
-                    'width': self.screen_width,
-                    'height': self.screen_height,
-                    'timestamp': time.time()
-                })
+            for msg in self._recent_chat(5):  # Show last 5 messages
+                msg_text = f"{msg.get('sender', 'Unknown')}: {msg.get('message', '')}"
+                entries.append((30, y_offset, '#2c3e50', msg_text))
+                y_offset += 20
+                if y_offset > self._chat_bottom:
+                    break
+        
+            # Add footer text
+            footer = f"Server: {self._hostname} | {len(self.clients)} clients connected"
+            entries.append((10, self._footer_text_y, 'white', footer))
+            
+            # Start from a copy of the cached background; the encode task owns it
+            img = self._screenshot_bg.copy()
+            draw_text = ImageDraw.Draw(img).text
+            font = self._font
+            for x, y, color, text in entries:
+                draw_text((x, y), text, fill=color, font=font, anchor='ls')
+            
+            # Encode and send on the pool so concurrent requests don't
+            # serialize behind the JPEG encoder on the command thread
+            self._encode_pool.submit(self._encode_screenshot, img, client_socket)
             
         except Exception as e:
             print(f"Error generating screenshot: {e}")
@@ -541,24 +921,41 @@ class MockServer:
             
             # Fallback to simple screenshot on error
             try:
-                with Image(width=800, height=600, background=Color('white')) as img:
-                    draw = Drawing()
-                    draw.fill_color = Color('red')
-                    draw.text(10, 10, f"Error generating screenshot: {e}")
-                    draw(img)
-                    
-                    img.format = 'jpeg'
-                    img_data = img.make_blob()
-                    
-                    self._send_message(client_socket, 'screenshot', {
-                        'data': base64.b64encode(img_data).decode('utf-8'),
-                        'width': 800,
-                        'height': 600,
-                        'error': str(e)
-                    })
+                img = Image.new('RGB', (800, 600), 'white')
+                draw = ImageDraw.Draw(img)
+                draw.text((10, 10), f"Error generating screenshot: {e}", fill='red')
+                
+                buf = io.BytesIO()
+                img.save(buf, 'JPEG', quality=70, subsampling=2)
+                
+                self._send_binary(client_socket, {
+                    'type': 'screenshot_meta',
+                    'width': 800,
+                    'height': 600,
+                    'error': str(e)
+                }, buf.getvalue())
             except Exception as e2:
                 print(f"Error in fallback screenshot: {e2}")
     
+    def _encode_screenshot(self, img, client_socket):
+        """Encode a rendered screenshot to JPEG and send it to the client."""
+        try:
+            # Convert to JPEG and get binary data
+            buf = io.BytesIO()
+            img.save(buf, 'JPEG', quality=70, subsampling=2, optimize=False)
+            img_data = buf.getvalue()
+            
+            # Send the metadata followed by the raw JPEG bytes
+            self._send_binary(client_socket, {
+                'type': 'screenshot_meta',
+                'width': self.screen_width,
+                'height': self.screen_height,
+                'timestamp': time.time()
+            }, img_data)
+        except Exception as e:
+            print(f"Error encoding screenshot: {e}")
+            traceback.print_exc()
+    
     def _handle_file_upload(self, client_socket, file_data):
         """Handle file upload."""
         try:
@@ -583,12 +980,11 @@ class MockServer:
             # For testing, create a dummy file
             file_content = f"This is a test file for {file_path}".encode('utf-8')
             
-            self._send_message(client_socket, 'file_download_response', {
+            self._send_binary(client_socket, {
+                'type': 'file_download_response',
                 'status': 'success',
-                'filename': file_path.split('/')[-1],
-                'data': base64.b64encode(file_content).decode('utf-8'),
-                'size': len(file_content)
-            })
+                'filename': file_path.split('/')[-1]
+            }, file_content)
         except Exception as e:
             print(f"Error handling file download: {e}")
             self._send_message(client_socket, 'file_download_response', {
@@ -0,0 +1 @@
+# Platform-independent helpers shared by the platform implementations
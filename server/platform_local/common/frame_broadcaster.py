@@ -0,0 +1,103 @@
+"""
+Shared screen capture for all clients requesting screenshots.
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class FrameBroadcaster:
+    """Capture the screen from one thread and hand the newest frame to every caller.
+
+    Capturing runs only while screenshots are being requested. The capture
+    interval starts at 1/target_fps and adapts to the measured capture time:
+    it widens by 10% when capturing takes longer than the interval and
+    tightens by 10% when it takes less than half, within MIN_INTERVAL and
+    MAX_INTERVAL.
+    """
+
+    MIN_INTERVAL = 0.015
+    MAX_INTERVAL = 0.2
+    # Stop capturing after this long without a request
+    IDLE_TIMEOUT = 2.0
+
+    def __init__(self, controller, target_fps: int = 30):
+        """
+        Initialize the broadcaster.
+
+        Args:
+            controller: Screen controller providing capture_screen()
+            target_fps: Initial capture rate
+        """
+        self.controller = controller
+        self.interval = min(max(1 / target_fps, self.MIN_INTERVAL), self.MAX_INTERVAL)
+        self.latest = None
+        self._latest_at = 0.0
+        self._seq = 0
+        self._capture_time = None  # EMA of capture_screen() duration, seconds
+        self._last_request = 0.0
+        self._thread = None
+        self._cond = threading.Condition()
+
+    def next_frame(self, timeout: float = 1.0):
+        """
+        Return the newest captured frame.
+
+        A frame captured within the current interval is returned at once;
+        otherwise this waits up to timeout for the next capture. Before the
+        first frame exists (e.g. while the capture thread is starting and
+        opening the screen) it waits for that capture to finish instead.
+
+        Returns:
+            bytes: Encoded frame, or None if capturing failed or timed out
+        """
+        with self._cond:
+            now = time.monotonic()
+            self._last_request = now
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            if self.latest is not None and now - self._latest_at < self.interval:
+                return self.latest
+            seq = self._seq
+            self._cond.wait_for(lambda: self._seq != seq,
+                                None if self.latest is None else timeout)
+            return self.latest
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if time.monotonic() - self._last_request > self.IDLE_TIMEOUT:
+                    self._thread = None
+                    return
+
+            started = time.monotonic()
+            try:
+                frame = self.controller.capture_screen()
+            except Exception as e:
+                logger.error(f"Error capturing screen: {e}")
+                frame = None
+            elapsed = time.monotonic() - started
+            self._tune(elapsed)
+
+            with self._cond:
+                self.latest = frame
+                self._latest_at = time.monotonic()
+                self._seq += 1
+                self._cond.notify_all()
+
+            remaining = self.interval - elapsed
+            if remaining > 0:
+                time.sleep(remaining)
+
+    def _tune(self, elapsed: float) -> None:
+        """Adjust the capture interval from an EMA of the capture time."""
+        if self._capture_time is None:
+            self._capture_time = elapsed
+        else:
+            self._capture_time = 0.8 * self._capture_time + 0.2 * elapsed
+        if self._capture_time > self.interval:
+            self.interval = min(self.interval * 1.1, self.MAX_INTERVAL)
+        elif self._capture_time < self.interval / 2:
+            self.interval = max(self.interval * 0.9, self.MIN_INTERVAL)
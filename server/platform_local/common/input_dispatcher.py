@@ -0,0 +1,81 @@
+"""
+Mouse-move coalescing in front of a platform input handler.
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Longest a mouse move may wait before it is injected
+MAX_QUEUE_TIME_MS = 16
+
+class CoalescingInputDispatcher:
+    """Forward input events to a handler, keeping only the latest pending mouse move.
+
+    Moves are absolute, so while a client drags only the last position in
+    each MAX_QUEUE_TIME_MS window is injected. Clicks and key presses run
+    synchronously after any pending move has been flushed, so event order
+    is preserved and their results still reach the caller.
+    """
+
+    def __init__(self, handler, max_queue_time_ms: int = MAX_QUEUE_TIME_MS):
+        """
+        Initialize the dispatcher.
+
+        Args:
+            handler: Platform input handler (send_mouse_move, send_mouse_click, ...)
+            max_queue_time_ms: Coalescing window for mouse moves
+        """
+        self.handler = handler
+        self._send_mouse_move = handler.send_mouse_move
+        self.interval = max_queue_time_ms / 1000
+        self._pending_move = None
+        self._pending = threading.Condition()
+        # Serializes calls into the handler
+        self._dispatch_lock = threading.Lock()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def move(self, x: int, y: int) -> None:
+        """Queue a mouse move, replacing any move that has not been injected yet."""
+        with self._pending:
+            self._pending_move = (x, y)
+            self._pending.notify()
+
+    def call(self, method: str, *args, **kwargs):
+        """Flush the pending move, then call a handler method and return its result."""
+        with self._dispatch_lock:
+            self._flush_move()
+            return getattr(self.handler, method)(*args, **kwargs)
+
+    def _flush_move(self) -> None:
+        """Inject the pending move, if any; called with the dispatch lock held."""
+        with self._pending:
+            position = self._pending_move
+            self._pending_move = None
+        if position is not None and not self._send_mouse_move(*position):
+            logger.warning(f"Failed to move mouse to {position}")
+
+    def _run(self) -> None:
+        while self._running:
+            with self._pending:
+                self._pending.wait_for(lambda: self._pending_move is not None or not self._running)
+            if not self._running:
+                break
+            # Let the rest of the drag arrive, then inject only where it ended
+            time.sleep(self.interval)
+            with self._dispatch_lock:
+                try:
+                    self._flush_move()
+                except Exception as e:
+                    logger.error(f"Error dispatching mouse move: {e}")
+
+    def close(self) -> None:
+        """Stop the dispatcher thread after flushing the pending move."""
+        self._running = False
+        with self._pending:
+            self._pending.notify()
+        with self._dispatch_lock:
+            self._flush_move()
@@ -0,0 +1,66 @@
+"""
+Hardware H.264/HEVC encoding of captured screen frames using NVIDIA NVENC.
+"""
+import logging
+import numpy as np
+
+try:
+    import PyNvVideoCodec as nvc
+    NVENC_AVAILABLE = True
+except ImportError:
+    NVENC_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+class NvencEncoder:
+    """Encode BGRX/BGRA screen frames to H.264 or HEVC on the GPU."""
+    
+    def __init__(self, codec: str = 'h264', preset: str = 'P1'):
+        """
+        Initialize the encoder.
+        
+        Args:
+            codec: 'h264' or 'hevc'
+            preset: NVENC preset, P1 (fastest) to P7 (best quality)
+        """
+        if not NVENC_AVAILABLE:
+            raise RuntimeError("PyNvVideoCodec not available")
+        self.codec = codec
+        self.preset = preset
+        self._encoder = None
+        self._size = None
+    
+    def encode(self, frame: np.ndarray) -> bytes:
+        """
+        Encode one frame.
+        
+        Args:
+            frame: (height, width, 4) uint8 array in B, G, R, X byte order,
+                which NVENC consumes directly as its ARGB input format
+            
+        Returns:
+            bytes: Encoded NAL units (may be empty while the encoder buffers)
+        """
+        height, width = frame.shape[:2]
+        if self._size != (width, height):
+            # NVENC sessions are fixed-size; start a new one on resize
+            self.close()
+            self._encoder = nvc.CreateEncoder(width, height, 'ARGB', True,
+                                              codec=self.codec, preset=self.preset)
+            self._size = (width, height)
+            logger.info(f"Created NVENC {self.codec} encoder for {width}x{height}")
+        return bytes(self._encoder.Encode(np.ascontiguousarray(frame)))
+    
+    def close(self):
+        """Flush and release the current encoder session."""
+        if self._encoder is not None:
+            try:
+                self._encoder.EndEncode()
+            except Exception as e:
+                logger.debug(f"Error ending NVENC session: {e}")
+            self._encoder = None
+            self._size = None
+    
+    def __del__(self):
+        """Clean up resources."""
+        self.close()
@@ -0,0 +1,80 @@
+"""
+Tile hashing for skipping re-encodes of unchanged screen areas.
+"""
+import zlib
+import numpy as np
+
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+# Fast non-cryptographic hash of a contiguous bytes-like object
+if XXHASH_AVAILABLE:
+    hash_buffer = xxhash.xxh3_64_intdigest
+else:
+    hash_buffer = zlib.crc32
+
+class TileCache:
+    """Per-tile content hashes of a frame plus the image last encoded from it.
+
+    The frame is split into fixed-size tiles and each tile is hashed
+    (xxh3 when xxhash is installed, CRC-32 otherwise). When no tile hash
+    changed since the previous frame, the cached encoded image is still valid.
+    """
+
+    def __init__(self, tile_size: int = 128):
+        self.tile_size = tile_size
+        self.tile_hash = None  # np.ndarray of uint64, shape (ny, nx)
+        self.encoded = None
+
+    def update(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Hash the tiles of a (height, width, channels) frame.
+
+        Returns:
+            np.ndarray: Boolean (ny, nx) mask of tiles that changed; all True
+                on the first frame or when the frame size changed
+        """
+        height, width = frame.shape[:2]
+        size = self.tile_size
+        ny = -(-height // size)
+        nx = -(-width // size)
+        hashes = np.empty((ny, nx), dtype=np.uint64)
+        for ty in range(ny):
+            rows = frame[ty * size:(ty + 1) * size]
+            for tx in range(nx):
+                tile = np.ascontiguousarray(rows[:, tx * size:(tx + 1) * size])
+                hashes[ty, tx] = hash_buffer(tile.data)
+
+        previous = self.tile_hash
+        self.tile_hash = hashes
+        if previous is None or previous.shape != hashes.shape:
+            self.encoded = None
+            return np.ones((ny, nx), dtype=bool)
+        changed = hashes != previous
+        if changed.any():
+            self.encoded = None
+        return changed
+
+    def dirty_rects(self, frame: np.ndarray) -> list:
+        """
+        Hash the tiles of a frame and return the ones that changed.
+
+        Returns:
+            list: (x, y, width, height) of each changed tile, clipped to the frame
+        """
+        height, width = frame.shape[:2]
+        size = self.tile_size
+        ys, xs = np.nonzero(self.update(frame))
+        return [(int(tx) * size, int(ty) * size,
+                 min(size, width - int(tx) * size), min(size, height - int(ty) * size))
+                for ty, tx in zip(ys, xs)]
+
+    def encode(self, frame: np.ndarray, encoder):
+        """Return the cached encoding of frame, calling encoder(frame) only if a tile changed."""
+        self.update(frame)
+        if self.encoded is None:
+            self.encoded = encoder(frame)
+        return self.encoded
@@ -3,12 +3,29 @@ Cross-platform input handling implementation.
 """
 import logging
 import os
+import threading
 
 logger = logging.getLogger(__name__)
 
 class LinuxInputHandler:
     """Cross-platform input handling implementation."""
     
+    # X11 core pointer button numbers
+    _X_BUTTONS = {'left': 1, 'middle': 2, 'right': 3}
+    
+    # pyautogui-style key names that differ from their X keysym names
+    _KEYSYM_NAMES = {
+        'enter': 'Return', 'return': 'Return', 'esc': 'Escape', 'escape': 'Escape',
+        'backspace': 'BackSpace', 'tab': 'Tab', 'space': 'space', 'delete': 'Delete',
+        'del': 'Delete', 'insert': 'Insert', 'home': 'Home', 'end': 'End',
+        'pageup': 'Prior', 'pagedown': 'Next', 'up': 'Up', 'down': 'Down',
+        'left': 'Left', 'right': 'Right', 'capslock': 'Caps_Lock',
+        'shift': 'Shift_L', 'shiftleft': 'Shift_L', 'shiftright': 'Shift_R',
+        'ctrl': 'Control_L', 'ctrlleft': 'Control_L', 'ctrlright': 'Control_R',
+        'alt': 'Alt_L', 'altleft': 'Alt_L', 'altright': 'Alt_R',
+        'win': 'Super_L', 'winleft': 'Super_L', 'winright': 'Super_R',
+    }
+    
     def __init__(self):
         """Initialize the input handler."""
         self.supported = True
@@ -26,14 +43,35 @@ class LinuxInputHandler:
             import pyautogui
             self.pyautogui = pyautogui
             
-            # Configure pyautogui
-            self.pyautogui.PAUSE = 0.1
+            # Configure pyautogui; a server must not sleep between calls
+            self.pyautogui.PAUSE = 0
             self.pyautogui.FAILSAFE = False
             logger.info("Initialized input handler with GUI support")
             
         except ImportError:
-            self.headless = True
             logger.warning("pyautogui not available - input simulation will be limited")
+        
+        # Inject events straight through XTest when available; each fake event
+        # is a single X request instead of several pyautogui layers
+        self._display = None
+        self._display_lock = threading.Lock()
+        self._keycodes = {}  # key name -> (keycode, needs_shift) or None
+        try:
+            from Xlib import X, XK, display
+            from Xlib.ext import xtest
+            
+            self._display = display.Display()
+            if not self._display.has_extension('XTEST'):
+                raise RuntimeError("XTEST extension not available")
+            self._X = X
+            self._XK = XK
+            self._xtest = xtest
+        except Exception as e:
+            self._display = None
+            logger.warning(f"XTest not available, using pyautogui for input: {e}")
+        
+        if not self.pyautogui and not self._display:
+            self.headless = True
     
     def send_mouse_click(self, x: int, y: int, button: str = 'left', double: bool = False) -> bool:
         """
@@ -48,12 +86,30 @@ class LinuxInputHandler:
         Returns:
             bool: True if successful, False otherwise
         """
-        if self.headless or not self.pyautogui:
+        if self.headless:
             logger.warning(f"Mouse click at ({x}, {y}) - not simulated in headless mode")
             return True  # Return True to avoid error messages
             
+        if self._display:
+            x_button = self._X_BUTTONS.get(button)
+            if x_button is None:
+                logger.warning(f"Unsupported mouse button: {button}")
+                return False
+            try:
+                X, xtest = self._X, self._xtest
+                with self._display_lock:
+                    xtest.fake_input(self._display, X.MotionNotify, x=x, y=y)
+                    for _ in range(2 if double else 1):
+                        xtest.fake_input(self._display, X.ButtonPress, x_button)
+                        xtest.fake_input(self._display, X.ButtonRelease, x_button)
+                    self._display.flush()
+                return True
+            except Exception as e:
+                logger.error(f"Error sending mouse click: {e}")
+                return False
+            
         try:
-            self.pyautogui.moveTo(x, y, duration=0.1)
+            self.pyautogui.moveTo(x, y)
             if button == 'left':
                 self.pyautogui.click(button='left', clicks=2 if double else 1)
             elif button == 'right':
@@ -79,18 +135,77 @@ class LinuxInputHandler:
         Returns:
             bool: True if successful, False otherwise
         """
-        if self.headless or not self.pyautogui:
+        if self.headless:
             # In headless mode, just log the movement
             logger.debug(f"Mouse move to ({x}, {y}) - not simulated in headless mode")
             return True
             
         try:
-            self.pyautogui.moveTo(x, y, duration=0.1)
+            if self._display:
+                with self._display_lock:
+                    self._xtest.fake_input(self._display, self._X.MotionNotify, x=x, y=y)
+                    self._display.flush()
+            else:
+                self.pyautogui.moveTo(x, y)
             return True
         except Exception as e:
             logger.error(f"Error moving mouse: {e}")
             return False
     
+    def _resolve_key(self, key: str):
+        """
+        Look up the X keycode for a key name, caching the result.
+        
+        Returns:
+            tuple: (keycode, needs_shift), or None if the key has no keycode
+        """
+        try:
+            return self._keycodes[key]
+        except KeyError:
+            pass
+        
+        name = self._KEYSYM_NAMES.get(key.lower(), key)
+        keysym = self._XK.string_to_keysym(name)
+        if not keysym and len(key) == 1:
+            # Latin-1 characters have keysyms equal to their code points
+            keysym = ord(key)
+        
+        resolved = None
+        if keysym:
+            with self._display_lock:
+                keycode = self._display.keysym_to_keycode(keysym)
+                if keycode:
+                    needs_shift = self._display.keycode_to_keysym(keycode, 0) != keysym
+                    resolved = (keycode, needs_shift)
+        self._keycodes[key] = resolved
+        return resolved
+    
+    def _fake_keys(self, keys) -> bool:
+        """
+        Press the resolved keys in order, then release them in reverse.
+        
+        Returns:
+            bool: False if a key needs shift but shift has no keycode
+        """
+        X, xtest = self._X, self._xtest
+        shift = None
+        if any(needs_shift for _, needs_shift in keys):
+            resolved = self._resolve_key('shift')
+            if resolved is None:
+                return False
+            shift = resolved[0]
+        with self._display_lock:
+            for keycode, needs_shift in keys:
+                if needs_shift:
+                    xtest.fake_input(self._display, X.KeyPress, shift)
+                xtest.fake_input(self._display, X.KeyPress, keycode)
+            for keycode, needs_shift in reversed(keys):
+                xtest.fake_input(self._display, X.KeyRelease, keycode)
+                if needs_shift:
+                    xtest.fake_input(self._display, X.KeyRelease, shift)
+            self._display.flush()
+        return True
+    
     def send_key_press(self, key: str, modifier: str = None) -> bool:
         """
         Send a key press event.
@@ -102,9 +217,24 @@ class LinuxInputHandler:
         Returns:
             bool: True if successful, False otherwise
         """
-        if self.headless or not self.pyautogui:
+        if self.headless:
             logger.warning(f"Key press {modifier + '+' if modifier else ''}{key} - not simulated in headless mode")
             return True
+        
+        if self._display:
+            keys = [self._resolve_key(modifier)] if modifier else []
+            keys.append(self._resolve_key(key))
+            if all(keys):
+                try:
+                    if self._fake_keys(keys):
+                        return True
+                except Exception as e:
+                    logger.error(f"Error sending key press: {e}")
+                    return False
+        
+        if not self.pyautogui:
+            logger.warning(f"Key {key} has no X keycode and pyautogui is not available")
+            return False
             
         try:
             if modifier:
@@ -2,33 +2,53 @@
 Linux-specific screen capture implementation.
 """
 import logging
-import subprocess
 import tempfile
 import os
+import sys
+import threading
 from typing import Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+_IS_LINUX = sys.platform.startswith('linux')
+
 class LinuxScreenCapture:
     """Linux-specific screen capture implementation."""
     
     def __init__(self):
         """Initialize Linux screen capture."""
+        self._size = (0, 0)
         try:
             # Check if we're actually on Linux
-            import platform
-            if platform.system().lower() != 'linux':
-                logger.warning("Linux screen capture is not supported on Windows")
+            if not _IS_LINUX:
+                logger.warning("Linux screen capture is only supported on Linux")
                 self.supported = False
                 return
             
             # Try to import required modules
             try:
                 import numpy as np
+                import mss
                 from wand.image import Image
                 self.np = np
                 self.Image = Image
+                self.mss = mss
+                # One mss instance per thread, kept for the whole session so the
+                # MIT-SHM segment is reused; mss binds its X resources to the
+                # thread that created it
+                self._mss = threading.local()
+                self._tj = None
+                try:
+                    from turbojpeg import TurboJPEG, TJPF_BGRA, TJSAMP_420
+                    self._tj = TurboJPEG()
+                    self._tj_pixel_format = TJPF_BGRA
+                    self._tj_subsample = TJSAMP_420
+                except Exception:
+                    # PyTurboJPEG or libjpeg-turbo missing; encode with wand
+                    pass
                 self.supported = True
+                # The resolution does not change during a session; query it once
+                self._size = self._query_screen_size()
                 logger.info("Linux screen capture initialized successfully")
             except ImportError as e:
                 logger.error(f"Failed to import required modules: {e}")
@@ -45,29 +65,23 @@ class LinuxScreenCapture:
         Returns:
             tuple: (width, height) of the screen
         """
-        if not self.supported:
-            return 0, 0
-            
+        return self._size
+    
+    def _query_screen_size(self) -> Tuple[int, int]:
+        """Read the root window size from the X server."""
         try:
-            # Use xrandr to get screen resolution
-            result = subprocess.run(['xrandr'], capture_output=True, text=True)
-            if result.returncode == 0:
-                for line in result.stdout.split('\n'):
-                    if '*' in line and 'x' in line:
-                        parts = line.split()
-                        for part in parts:
-                            if 'x' in part and '+' not in part:
-                                try:
-                                    width, height = part.split('x')
-                                    return int(width), int(height)
-                                except ValueError:
-                                    continue
+            from Xlib import display
             
-            # Fallback to a common resolution
-            return 1920, 1080
+            d = display.Display()
+            try:
+                screen = d.screen()
+                return screen.width_in_pixels, screen.height_in_pixels
+            finally:
+                d.close()
             
         except Exception as e:
             logger.error(f"Error getting screen size: {e}")
+            # Fallback to a common resolution
             return 1920, 1080
     
     def capture_screen(self) -> Optional[bytes]:
@@ -75,31 +89,42 @@ class LinuxScreenCapture:
         Capture the entire screen.
         
         Returns:
-            bytes: PNG image data if successful, None otherwise
+            bytes: JPEG image data if successful, None otherwise
         """
         if not self.supported:
             logger.warning("Linux screen capture not supported")
             return None
-            
+        
         try:
-            # Try using import first
-            result = subprocess.run([
-                'import', '-window', 'root', '-screen', 'png', '-'
-            ], capture_output=True)
-            
-            if result.returncode == 0:
-                return result.stdout
+            area = self._sct().monitors[0]
+        except Exception as e:
+            logger.error(f"Error capturing screen: {e}")
+            return None
+        return self._grab(area)
+    
+    def _sct(self):
+        """Return this thread's mss instance, creating it on first use."""
+        sct = getattr(self._mss, 'sct', None)
+        if sct is None:
+            sct = self._mss.sct = self.mss.mss()
+        return sct
+    
+    def _grab(self, area) -> Optional[bytes]:
+        """Grab an mss area (dict with left/top/width/height) and encode it as JPEG."""
+        try:
+            # XShmGetImage into shared memory; BGRA pixels, no child process
+            raw = self._sct().grab(area)
+            frame = self.np.asarray(raw)
             
-            # Fallback to scrot
-            result = subprocess.run([
-                'scrot', '-f', 'png', '-'
-            ], capture_output=True)
+            if self._tj is not None:
+                return self._tj.encode(frame, quality=70, pixel_format=self._tj_pixel_format,
+                                       jpeg_subsample=self._tj_subsample)
             
-            if result.returncode == 0:
-                return result.stdout
-                
-            logger.error("Neither import nor scrot available for screen capture")
-            return None
+            with self.Image.from_array(self.np.ascontiguousarray(frame[:, :, 2::-1])) as img:
+                img.format = 'jpeg'
+                img.compression_quality = 70
+                img.options['jpeg:sampling-factor'] = '4:2:0'
+                return img.make_blob()
             
         except Exception as e:
             logger.error(f"Error capturing screen: {e}")
@@ -116,7 +141,10 @@ class LinuxScreenCapture:
             height: Height of the region
             
         Returns:
-            bytes: PNG image data if successful, None otherwise
+            bytes: JPEG image data if successful, None otherwise
         """
-        logger.warning("Linux screen capture is not supported on Windows")
-        return None
+        if not self.supported:
+            logger.warning("Linux screen capture not supported")
+            return None
+        
+        return self._grab({'left': x, 'top': y, 'width': width, 'height': height})
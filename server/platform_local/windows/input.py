@@ -1,9 +1,29 @@
 """
 Windows-specific input handling implementation.
 """
+import ctypes
 import win32api
 import win32con
-import time
+
+from server.platform_local.windows.sendinput import (
+    INPUT, INPUT_KEYBOARD, INPUT_MOUSE, KEYBDINPUT, MOUSEINPUT, SendInput)
+
+# Map absolute coordinates to the whole virtual desktop
+MOUSEEVENTF_VIRTUALDESK = 0x4000
+
+def _mouse_input(flags: int, dx: int = 0, dy: int = 0) -> INPUT:
+    """Build a mouse INPUT record."""
+    return INPUT(type=INPUT_MOUSE, mi=MOUSEINPUT(dx=dx, dy=dy, dwFlags=flags))
+
+def _key_input(vk: int, flags: int = 0) -> INPUT:
+    """Build a keyboard INPUT record."""
+    return INPUT(type=INPUT_KEYBOARD, ki=KEYBDINPUT(wVk=vk, dwFlags=flags))
+
+def _send_inputs(inputs) -> bool:
+    """Inject a sequence of INPUT records with a single SendInput call."""
+    n = len(inputs)
+    sent = SendInput(n, (INPUT * n)(*inputs), ctypes.sizeof(INPUT))
+    return sent == n
 
 class WindowsInputHandler:
     """Windows-specific input handling implementation."""
@@ -35,11 +55,14 @@ class WindowsInputHandler:
         'f12': 0x7B,
     }
     
-    # Mouse button codes
+    # Virtual key code of each ASCII character, resolved once at import
+    _ASCII_VK = tuple(win32api.VkKeyScan(chr(i)) & 0xff for i in range(128))
+    
+    # Mouse button (down, up) event flags
     MOUSE_BUTTONS = {
-        'left': win32con.MOUSEEVENTF_LEFTDOWN,
-        'right': win32con.MOUSEEVENTF_RIGHTDOWN,
-        'middle': win32con.MOUSEEVENTF_MIDDLEDOWN
+        'left': (win32con.MOUSEEVENTF_LEFTDOWN, win32con.MOUSEEVENTF_LEFTUP),
+        'right': (win32con.MOUSEEVENTF_RIGHTDOWN, win32con.MOUSEEVENTF_RIGHTUP),
+        'middle': (win32con.MOUSEEVENTF_MIDDLEDOWN, win32con.MOUSEEVENTF_MIDDLEUP)
     }
     
     def __init__(self):
@@ -60,25 +83,34 @@ class WindowsInputHandler:
             bool: True if successful, False otherwise
         """
         try:
-            # Move to the position
-            win32api.SetCursorPos((x, y))
-            
-            # Get the button code
-            btn_code = self.MOUSE_BUTTONS.get(button.lower(), win32con.MOUSEEVENTF_LEFTDOWN)
-            
-            # Perform the click(s)
-            win32api.mouse_event(btn_code, x, y, 0, 0)  # Button down
-            win32api.mouse_event(btn_code * 2, x, y, 0, 0)  # Button up
+            # Get the button codes
+            down, up = self.MOUSE_BUTTONS.get(button.lower(), self.MOUSE_BUTTONS['left'])
             
+            # Move and click in one injected batch
+            dx, dy = self._to_absolute(x, y)
+            inputs = [
+                _mouse_input(win32con.MOUSEEVENTF_MOVE | win32con.MOUSEEVENTF_ABSOLUTE
+                             | MOUSEEVENTF_VIRTUALDESK, dx, dy),
+                _mouse_input(down),  # Button down
+                _mouse_input(up)  # Button up
+            ]
             if double:
-                time.sleep(0.1)  # Small delay between clicks
-                win32api.mouse_event(btn_code, x, y, 0, 0)  # Button down
-                win32api.mouse_event(btn_code * 2, x, y, 0, 0)  # Button up
-                
-            return True
+                # Back-to-back pairs fall well inside GetDoubleClickTime()
+                inputs += [_mouse_input(down), _mouse_input(up)]
+            
+            return _send_inputs(inputs)
         except Exception as e:
             return False
     
+    @staticmethod
+    def _to_absolute(x: int, y: int) -> tuple:
+        """Convert virtual-desktop pixels to SendInput's 0..65535 absolute range."""
+        left = win32api.GetSystemMetrics(win32con.SM_XVIRTUALSCREEN)
+        top = win32api.GetSystemMetrics(win32con.SM_YVIRTUALSCREEN)
+        width = max(win32api.GetSystemMetrics(win32con.SM_CXVIRTUALSCREEN) - 1, 1)
+        height = max(win32api.GetSystemMetrics(win32con.SM_CYVIRTUALSCREEN) - 1, 1)
+        return (x - left) * 65535 // width, (y - top) * 65535 // height
+    
     def send_mouse_move(self, x: int, y: int) -> bool:
         """
         Move the mouse cursor to the specified coordinates.
@@ -108,30 +140,28 @@ class WindowsInputHandler:
             bool: True if successful, False otherwise
         """
         try:
-            # Handle modifier keys
-            if modifier:
-                mod_code = self.VK_CODES.get(modifier.lower())
-                if mod_code:
-                    win32api.keybd_event(mod_code, 0, 0, 0)  # Key down
-            
             # Handle the main key
             if len(key) == 1:  # Single character
                 # Convert to virtual key code
-                vk_code = win32api.VkKeyScan(ord(key)) & 0xff
-                win32api.keybd_event(vk_code, 0, 0, 0)  # Key down
-                win32api.keybd_event(vk_code, 0, win32con.KEYEVENTF_KEYUP, 0)  # Key up
+                code = ord(key)
+                vk_code = self._ASCII_VK[code] if code < 128 else win32api.VkKeyScan(key) & 0xff
             else:  # Special key
-                key_code = self.VK_CODES.get(key.lower())
-                if key_code:
-                    win32api.keybd_event(key_code, 0, 0, 0)  # Key down
-                    win32api.keybd_event(key_code, 0, win32con.KEYEVENTF_KEYUP, 0)  # Key up
+                vk_code = self.VK_CODES.get(key.lower())
+            
+            inputs = []
+            if vk_code:
+                inputs = [_key_input(vk_code), _key_input(vk_code, win32con.KEYEVENTF_KEYUP)]
             
-            # Release modifier key if pressed
+            # Wrap the key in the modifier's down/up pair
             if modifier:
                 mod_code = self.VK_CODES.get(modifier.lower())
                 if mod_code:
-                    win32api.keybd_event(mod_code, 0, win32con.KEYEVENTF_KEYUP, 0)  # Key up
+                    inputs.insert(0, _key_input(mod_code))
+                    inputs.append(_key_input(mod_code, win32con.KEYEVENTF_KEYUP))
             
+            # Inject the whole chord atomically
+            if inputs:
+                return _send_inputs(inputs)
             return True
         except:
             return False
@@ -11,15 +11,55 @@ import win32con
 import win32api
 from ctypes import wintypes
 
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGRX, TJSAMP_420
+    TURBOJPEG_AVAILABLE = True
+except ImportError:
+    TURBOJPEG_AVAILABLE = False
+
+try:
+    import dxcam
+    DXCAM_AVAILABLE = True
+except ImportError:
+    DXCAM_AVAILABLE = False
+
 class WindowsScreenCapture:
     """Windows-specific screen capture implementation."""
     
-    def __init__(self):
-        """Initialize the Windows screen capture."""
+    def __init__(self, format: str = 'jpeg', quality: int = 75):
+        """
+        Initialize the Windows screen capture.
+        
+        Args:
+            format: Output image format, 'jpeg' or 'png'
+            quality: JPEG quality (1-100), ignored for PNG
+        """
+        self.format = format.lower()
+        self.quality = quality
+        self._tj = None
+        if self.format == 'jpeg' and TURBOJPEG_AVAILABLE:
+            try:
+                self._tj = TurboJPEG()
+            except Exception:
+                # libjpeg-turbo shared library not found; fall back to wand
+                self._tj = None
+        
+        # DXGI Desktop Duplication hands over the composited frame from the
+        # GPU and reports when nothing changed; GDI BitBlt is the fallback
+        # (e.g. in RDP sessions where duplication is unavailable)
+        self._dxgi = None
+        self._last_frame = None  # (region, encoded bytes) of the last capture
+        if DXCAM_AVAILABLE:
+            try:
+                self._dxgi = dxcam.create(output_color='BGRA')
+            except Exception:
+                self._dxgi = None
+        
         self.hwnd = win32gui.GetDesktopWindow()
         self.hwndDC = win32gui.GetWindowDC(self.hwnd)
         self.mfcDC = win32ui.CreateDCFromHandle(self.hwndDC)
         self.saveDC = self.mfcDC.CreateCompatibleDC()
+        self._cached = None  # (width, height, bitmap) selected into saveDC
         
     def get_screen_size(self) -> tuple:
         """
@@ -37,7 +77,7 @@ class WindowsScreenCapture:
         Capture the entire screen.
         
         Returns:
-            bytes: PNG image data
+            bytes: JPEG or PNG image data, depending on ``format``
         """
         width, height = self.get_screen_size()
         return self.capture_region(0, 0, width, height)
@@ -53,12 +93,38 @@ class WindowsScreenCapture:
             height: Height of the region
             
         Returns:
-            bytes: PNG image data
+            bytes: JPEG or PNG image data, depending on ``format``
         """
-        # Create a bitmap
-        saveBitMap = win32ui.CreateBitmap()
-        saveBitMap.CreateCompatibleBitmap(self.mfcDC, width, height)
-        self.saveDC.SelectObject(saveBitMap)
+        region = (x, y, width, height)
+        img_data = None
+        if self._dxgi is not None:
+            try:
+                img_data = self._dxgi.grab(region=(x, y, x + width, y + height))
+            except Exception:
+                img_data = None
+            if img_data is None and self._last_frame is not None and self._last_frame[0] == region:
+                # No new frame since the last capture; skip grabbing and encoding
+                return self._last_frame[1]
+        
+        if img_data is None:
+            img_data = self._capture_gdi(x, y, width, height)
+        
+        result = self._encode(img_data)
+        self._last_frame = (region, result)
+        return result
+    
+    def _capture_gdi(self, x: int, y: int, width: int, height: int) -> np.ndarray:
+        """BitBlt a region of the desktop and return it as a BGRX array."""
+        # Reuse the bitmap from the previous frame unless the size changed
+        if self._cached is not None and self._cached[:2] == (width, height):
+            saveBitMap = self._cached[2]
+        else:
+            saveBitMap = win32ui.CreateBitmap()
+            saveBitMap.CreateCompatibleBitmap(self.mfcDC, width, height)
+            self.saveDC.SelectObject(saveBitMap)
+            if self._cached is not None:
+                win32gui.DeleteObject(self._cached[2].GetHandle())
+            self._cached = (width, height, saveBitMap)
         
         # Copy the screen to the bitmap
         self.saveDC.BitBlt(
@@ -67,34 +133,37 @@ class WindowsScreenCapture:
             win32con.SRCCOPY
         )
         
-        # Convert to wand Image and then to PNG bytes
-        import io
-        
-        # Get bitmap info and bits
-        bmpinfo = saveBitMap.GetInfo()
+        # Get bitmap bits as a BGRX view, without copying
         bmpstr = saveBitMap.GetBitmapBits(True)
-        
-        # Create a wand Image from the raw bitmap data
-        img_data = np.frombuffer(bmpstr, dtype=np.uint8).reshape((height, width, 4))
+        return np.frombuffer(bmpstr, dtype=np.uint8).reshape((height, width, 4))
+    
+    def _encode(self, img_data: np.ndarray) -> bytes:
+        """Encode a BGRX/BGRA frame in the configured format."""
+        if self._tj is not None:
+            # libjpeg-turbo encodes straight from BGRX with SIMD
+            return self._tj.encode(img_data, quality=self.quality,
+                                   pixel_format=TJPF_BGRX, jpeg_subsample=TJSAMP_420)
         
         # Convert BGRX to RGB (remove the X channel)
-        rgb_data = img_data[:, :, [2, 1, 0]]  # BGR -> RGB
+        rgb_data = np.ascontiguousarray(img_data[:, :, 2::-1])  # BGR -> RGB, strided copy
         
         # Create wand image from numpy array
         with Image.from_array(rgb_data) as img:
-            img_byte_arr = io.BytesIO()
-            img.format = 'png'
-            img.save(img_byte_arr)
-            result = img_byte_arr.getvalue()
-        
-        # Clean up
-        win32gui.DeleteObject(saveBitMap.GetHandle())
-        
-        return result
+            if self.format == 'jpeg':
+                img.format = 'jpeg'
+                img.compression_quality = self.quality
+                img.options['jpeg:sampling-factor'] = '4:2:0'
+            else:
+                img.format = 'png'
+            return img.make_blob()
     
     def __del__(self):
         """Clean up resources."""
         try:
+            if self._dxgi is not None:
+                self._dxgi.release()
+            if self._cached is not None:
+                win32gui.DeleteObject(self._cached[2].GetHandle())
             self.saveDC.DeleteDC()
             self.mfcDC.DeleteDC()
             win32gui.ReleaseDC(self.hwnd, self.hwndDC)
@@ -0,0 +1,57 @@
+"""
+SendInput structures shared by the Windows input implementations.
+"""
+import ctypes
+from ctypes import wintypes
+
+# Input types for SendInput
+INPUT_MOUSE = 0
+INPUT_KEYBOARD = 1
+
+# ctypes.wintypes has no ULONG_PTR; WPARAM is the pointer-sized unsigned type
+ULONG_PTR = wintypes.WPARAM
+
+class MOUSEINPUT(ctypes.Structure):
+    _fields_ = [
+        ('dx', wintypes.LONG),
+        ('dy', wintypes.LONG),
+        ('mouseData', wintypes.DWORD),
+        ('dwFlags', wintypes.DWORD),
+        ('time', wintypes.DWORD),
+        ('dwExtraInfo', ULONG_PTR)
+    ]
+
+class KEYBDINPUT(ctypes.Structure):
+    _fields_ = [
+        ('wVk', wintypes.WORD),
+        ('wScan', wintypes.WORD),
+        ('dwFlags', wintypes.DWORD),
+        ('time', wintypes.DWORD),
+        ('dwExtraInfo', ULONG_PTR)
+    ]
+
+class HARDWAREINPUT(ctypes.Structure):
+    _fields_ = [
+        ('uMsg', wintypes.DWORD),
+        ('wParamL', wintypes.WORD),
+        ('wParamH', wintypes.WORD)
+    ]
+
+class _INPUTUNION(ctypes.Union):
+    _fields_ = [
+        ('mi', MOUSEINPUT),
+        ('ki', KEYBDINPUT),
+        ('hi', HARDWAREINPUT)
+    ]
+
+class INPUT(ctypes.Structure):
+    _anonymous_ = ('u',)
+    _fields_ = [
+        ('type', wintypes.DWORD),
+        ('u', _INPUTUNION)
+    ]
+
+# SendInput(count, INPUT array, sizeof(INPUT)) -> number of events injected
+SendInput = ctypes.WinDLL('user32', use_last_error=True).SendInput
+SendInput.argtypes = [wintypes.UINT, ctypes.POINTER(INPUT), ctypes.c_int]
+SendInput.restype = wintypes.UINT
@@ -2,17 +2,20 @@
 Screen controller for capturing and managing screen content.
 """
 import logging
+import sys
 from typing import Optional, Tuple
-import platform
 
 logger = logging.getLogger(__name__)
 
+_IS_WINDOWS = sys.platform == 'win32'
+_IS_LINUX = sys.platform.startswith('linux')
+
 class ScreenController:
     """Controller for screen capture functionality."""
     
     def __init__(self):
         """Initialize the screen controller."""
-        self.platform = platform.system().lower()
+        self.platform = 'windows' if _IS_WINDOWS else 'linux' if _IS_LINUX else sys.platform
         self.screen_available = False
         self.screen_width = 0
         self.screen_height = 0
@@ -26,11 +29,11 @@ class ScreenController:
             bool: True if initialization was successful, False otherwise
         """
         try:
-            if self.platform == 'windows':
+            if _IS_WINDOWS:
                 from .platform.windows.screen import WindowsScreenCapture
                 self.capture = WindowsScreenCapture()
                 self.screen_available = True
-            elif self.platform == 'linux':
+            elif _IS_LINUX:
                 from .platform.linux.screen import LinuxScreenCapture
                 self.capture = LinuxScreenCapture()
                 self.screen_available = True
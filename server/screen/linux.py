@@ -4,18 +4,53 @@ Linux-specific screen capture implementation using X11 with fallback for headles
 import os
 import sys
 import io
+import time
 import logging
+import threading
+from collections import deque
 import numpy as np
 from PIL import Image
 
+from server.platform_local.common.tilecache import TileCache, hash_buffer
+
 try:
     from Xlib import display, X
+    from Xlib import error as xerror
     from Xlib.ext import xfixes
     X11_AVAILABLE = True
 except (ImportError, OSError) as e:
     X11_AVAILABLE = False
     logging.warning(f"X11 not available: {e}. Running in headless mode.")
 
+try:
+    from Xlib.ext import damage
+    DAMAGE_AVAILABLE = True
+except ImportError:
+    DAMAGE_AVAILABLE = False
+
+try:
+    import mss
+    from mss.exception import ScreenShotError
+    MSS_AVAILABLE = True
+except ImportError:
+    MSS_AVAILABLE = False
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGRX, TJSAMP_420
+    TURBOJPEG_AVAILABLE = True
+except ImportError:
+    TURBOJPEG_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Errors a capture can raise transiently (e.g. BadMatch while the screen is
+# being reconfigured, or a dropped X connection)
+_CAPTURE_ERRORS = (OSError,)
+if X11_AVAILABLE:
+    _CAPTURE_ERRORS += (xerror.XError, xerror.ConnectionClosedError)
+if MSS_AVAILABLE:
+    _CAPTURE_ERRORS += (ScreenShotError,)
+
 class HeadlessScreenController:
     """Fallback screen controller for headless environments."""
     
@@ -23,7 +58,9 @@ class HeadlessScreenController:
         self.width = width
         self.height = height
         self.xfix = None
-        logging.info("Initialized headless screen controller")
+        # Encoded black frames keyed by (width, height); the output never varies
+        self._black_cache = {}
+        logger.info("Initialized headless screen controller")
     
     def capture_screen(self, region=None):
         """Return a blank black image as JPEG bytes for headless environments."""
@@ -33,18 +70,22 @@ class HeadlessScreenController:
                 height = min(region[3], self.height)
             else:
                 width, height = self.width, self.height
+            
+            cached = self._black_cache.get((width, height))
+            if cached is not None:
+                return cached
                 
             # Create a black image
-            img_array = np.zeros((height, width, 3), dtype=np.uint8)
-            img = Image.fromarray(img_array, 'RGB')
+            img = Image.new('RGB', (width, height), (0, 0, 0))
             
             # Convert to bytes
             img_byte_arr = io.BytesIO()
             img.save(img_byte_arr, format='JPEG')
-            return img_byte_arr.getvalue()
+            result = self._black_cache[(width, height)] = img_byte_arr.getvalue()
+            return result
             
         except Exception as e:
-            logging.error(f"Error in headless screen capture: {e}")
+            logger.error(f"Error in headless screen capture: {e}")
             # Return a minimal black image (1x1 pixel) as fallback
             img = Image.new('RGB', (1, 1), (0, 0, 0))
             img_byte_arr = io.BytesIO()
@@ -63,12 +104,69 @@ class HeadlessScreenController:
 class LinuxScreenController:
     """Linux screen capture and control using X11 with fallback to headless mode."""
     
-    def __init__(self):
+    def __init__(self, encoder=None):
+        """
+        Args:
+            encoder: 'nvenc' to return H.264 NAL units from capture_screen
+                instead of JPEG images
+        """
+        self.encoder = encoder
+        self._nvenc = None
+        if encoder == 'nvenc':
+            try:
+                from server.platform_local.common.nvenc_encoder import NvencEncoder
+                self._nvenc = NvencEncoder()
+            except Exception as e:
+                logger.warning(f"NVENC not available, using image encoding: {e}")
+                self.encoder = None
         self.xfix = None
         self.display = None
         self.screen = None
         self.root = None
         self.headless = False
+        # X Damage tracking: full-screen captures only re-read what changed
+        self._damage = None
+        self._frame = None  # Last full-screen BGRX frame, patched in place
+        # Bumped whenever _frame changes; each consumer remembers the last
+        # generation it used, so a static screen is never re-encoded
+        self._frame_gen = 0
+        self._frame_hash = None  # Without X Damage: hash of _frame
+        self._last_jpeg = None
+        self._last_jpeg_gen = -1
+        self._pushed_gen = -1
+        # Reused JPEG output buffer; the lock also serializes use of the
+        # (not thread-safe) Xlib display across connection threads
+        self._buf = io.BytesIO()
+        self._capture_lock = threading.Lock()
+        # libjpeg-turbo encodes into a caller-owned buffer, grown on demand;
+        # the encode lock guards both output buffers
+        self._tj = None
+        self._jpeg_buf = bytearray()
+        self._encode_lock = threading.Lock()
+        # Full-screen JPEG pipeline: a capture thread feeds raw frames to an
+        # encoder thread, and capture_screen() returns the newest JPEG. Both
+        # threads stop once no screenshot was requested for pipeline_idle_timeout
+        self.frame_interval = 1 / 30
+        self.pipeline_idle_timeout = 2.0
+        self._raw_frames = deque(maxlen=2)
+        self._jpeg_frames = deque(maxlen=2)
+        self._raw_ready = threading.Condition()
+        self._jpeg_ready = threading.Condition()  # Also guards the pipeline state
+        self._pipeline = None  # Token of the running pipeline; its threads exit when replaced
+        self._last_request = 0.0
+        # Region captures: a TileCache per requested region, so polling an
+        # unchanged area skips the JPEG encode
+        self._region_tiles = {}
+        # Dirty-tile deltas of the full screen, see capture_dirty_tiles()
+        self._delta_tiles = TileCache(tile_size=64)
+        # mss reads pixels through MIT-SHM instead of streaming them over the
+        # X socket; an mss instance is bound to the thread that created it
+        self._mss = threading.local() if MSS_AVAILABLE else None
+        if TURBOJPEG_AVAILABLE:
+            try:
+                self._tj = TurboJPEG()
+            except Exception as e:
+                logger.info(f"libjpeg-turbo not available, using PIL for JPEG: {e}")
         
         try:
             if not X11_AVAILABLE:
@@ -86,12 +184,16 @@ class LinuxScreenController:
             if self.display.has_extension('XFIXES'):
                 self.xfix = self.display.xfixes
                 self.xfix_version = self.display.xfixes_query_version()
+            
+            if DAMAGE_AVAILABLE and self.display.has_extension('DAMAGE'):
+                self.display.damage_query_version()
+                self._damage = self.root.damage_create(damage.DamageReportBoundingBox)
                 
-            logging.info("Initialized X11 screen controller")
+            logger.info("Initialized X11 screen controller")
             
         except Exception as e:
-            logging.warning(f"Failed to initialize X11 screen controller: {e}")
-            logging.info("Falling back to headless mode")
+            logger.warning(f"Failed to initialize X11 screen controller: {e}")
+            logger.info("Falling back to headless mode")
             self.headless = True
             self._headless_controller = HeadlessScreenController()
             self.width, self.height = self._headless_controller.get_screen_size()
@@ -100,44 +202,245 @@ class LinuxScreenController:
         """Capture a screenshot of the screen or specified region and return as JPEG bytes."""
         if self.headless:
             return self._headless_controller.capture_screen(region)
-            
+        
+        if region or self._nvenc is not None:
+            with self._capture_lock:
+                return self._capture_x11(region)
+        
+        with self._jpeg_ready:
+            self._last_request = time.monotonic()
+            if self._pipeline is None:
+                self._start_pipeline()
+            if self._jpeg_ready.wait_for(lambda: self._jpeg_frames, timeout=1.0):
+                return self._jpeg_frames[-1]
+        # The pipeline has not produced a frame yet (e.g. still starting up)
+        with self._capture_lock:
+            return self._capture_x11(None)
+    
+    def _start_pipeline(self):
+        """Start the capture and encoder threads; called with _jpeg_ready held."""
+        token = self._pipeline = object()
+        self._jpeg_frames.clear()
+        with self._raw_ready:
+            self._raw_frames.clear()
+        self._pushed_gen = -1
+        threading.Thread(target=self._capture_loop, args=(token,), daemon=True).start()
+        threading.Thread(target=self._encode_loop, args=(token,), daemon=True).start()
+    
+    def _capture_loop(self, token):
+        """Read full-screen frames from the X server at the frame interval until idle."""
+        while True:
+            with self._jpeg_ready:
+                if time.monotonic() - self._last_request > self.pipeline_idle_timeout:
+                    # Nobody is asking for screenshots; stop both threads
+                    self._pipeline = None
+                    self._jpeg_frames.clear()
+                    break
+            started = time.monotonic()
+            try:
+                with self._capture_lock:
+                    frame = None
+                    self._update_frame()
+                    if self._frame_gen != self._pushed_gen:
+                        self._pushed_gen = self._frame_gen
+                        # The damage path patches _frame in place, so hand over a copy
+                        frame = self._frame.copy() if self._damage is not None else self._frame
+                if frame is not None:
+                    with self._raw_ready:
+                        self._raw_frames.append(frame)
+                        self._raw_ready.notify_all()
+            except Exception:
+                # Keep the capture thread alive through transient failures
+                logger.exception("Error capturing screen")
+            remaining = self.frame_interval - (time.monotonic() - started)
+            if remaining > 0:
+                time.sleep(remaining)
+        with self._raw_ready:
+            self._raw_ready.notify_all()
+    
+    def _encode_loop(self, token):
+        """Encode the newest raw frame, dropping any the encoder fell behind on."""
+        while True:
+            with self._raw_ready:
+                self._raw_ready.wait_for(lambda: self._raw_frames or self._pipeline is not token)
+                if self._pipeline is not token:
+                    return
+                frame = self._raw_frames.pop()
+                self._raw_frames.clear()
+            try:
+                jpeg = self._encode_jpeg(frame)
+            except Exception:
+                logger.exception("Error encoding screen")
+                continue
+            with self._jpeg_ready:
+                if self._pipeline is not token:
+                    return
+                self._jpeg_frames.append(jpeg)
+                self._jpeg_ready.notify_all()
+    
+    def capture_dirty_tiles(self):
+        """
+        Capture the full screen and JPEG-encode only the tiles that changed.
+        
+        The first call returns every tile; a static screen returns an
+        empty list.
+        
+        Returns:
+            list: (x, y, width, height, jpeg_bytes) per changed 64x64 tile,
+                or None on failure
+        """
+        if self.headless:
+            return None
+        
+        with self._capture_lock:
+            try:
+                self._update_frame()
+            except _CAPTURE_ERRORS:
+                logger.exception("Error capturing screen")
+                return None
+            frame = self._frame
+            return [(x, y, w, h, self._encode_jpeg(np.ascontiguousarray(frame[y:y + h, x:x + w])))
+                    for x, y, w, h in self._delta_tiles.dirty_rects(frame)]
+    
+    def _capture_x11(self, region):
+        """Capture from the X server; called with the capture lock held."""
+        if not region:
+            try:
+                self._update_frame()
+            except _CAPTURE_ERRORS:
+                logger.exception("Error capturing screen")
+                return None
+            if self._nvenc is not None:
+                return self._nvenc.encode(self._frame)
+            if self._last_jpeg_gen != self._frame_gen:
+                self._last_jpeg = self._encode_jpeg(self._frame)
+                self._last_jpeg_gen = self._frame_gen
+            return self._last_jpeg
+        
+        x, y, width, height = region
+        # Ensure the region is within screen bounds
+        x = max(0, min(x, self.width - 1))
+        y = max(0, min(y, self.height - 1))
+        width = min(width, self.width - x)
+        height = min(height, self.height - y)
+        
         try:
-            if region:
-                x, y, width, height = region
-                # Ensure the region is within screen bounds
-                x = max(0, min(x, self.width - 1))
-                y = max(0, min(y, self.height - 1))
-                width = min(width, self.width - x)
-                height = min(height, self.height - y)
-            else:
-                x, y = 0, 0
-                width, height = self.width, self.height
-            
-            # Get the image data
-            raw = self.root.get_image(
-                x, y, width, height,
-                X.ZPixmap, 0xffffffff
-            )
-            
-            # Convert to PIL Image and then to JPEG bytes
-            img = Image.frombytes("RGB", (width, height), raw.data, "raw", "BGRX")
-            img_byte_arr = io.BytesIO()
-            img.save(img_byte_arr, format='JPEG')
-            return img_byte_arr.getvalue()
-            img = Image.frombuffer(
-                'RGB', (width, height),
-                raw.data, 'raw', 'BGRX', 0, 1
-            )
-            
-            # Convert to bytes
-            img_byte_arr = io.BytesIO()
-            img.save(img_byte_arr, format='JPEG', quality=70)
-            
-            return img_byte_arr.getvalue()
-            
-        except Exception as e:
-            print(f"Error capturing screen: {e}")
+            frame = self._grab(x, y, width, height)
+        except _CAPTURE_ERRORS:
+            logger.exception("Error capturing screen")
+            return None
+        if self._nvenc is not None:
+            # Encode on the GPU straight from the BGRX pixels
+            return self._nvenc.encode(frame)
+        
+        key = (x, y, width, height)
+        tiles = self._region_tiles.get(key)
+        if tiles is None:
+            if len(self._region_tiles) >= 16:
+                self._region_tiles.clear()
+            tiles = self._region_tiles[key] = TileCache()
+        return tiles.encode(frame, self._encode_jpeg)
+    
+    def _collect_damage(self):
+        """Return the bounding box (x0, y0, x1, y1) damaged since the last call, or None."""
+        box = None
+        
+        def drain():
+            nonlocal box
+            while self.display.pending_events():
+                event = self.display.next_event()
+                if not isinstance(event, damage.DamageNotify):
+                    continue
+                area = event.area
+                x0, y0 = area.x, area.y
+                x1, y1 = area.x + area.width, area.y + area.height
+                if box is None:
+                    box = (x0, y0, x1, y1)
+                else:
+                    box = (min(box[0], x0), min(box[1], y0), max(box[2], x1), max(box[3], y1))
+        
+        drain()
+        # Reset the damage, then pick up any events that were still in flight;
+        # anything damaged after the reset is reported again next time
+        self.display.damage_subtract(self._damage)
+        self.display.sync()
+        drain()
+        
+        if box is None:
+            return None
+        x0, y0 = max(0, box[0]), max(0, box[1])
+        x1, y1 = min(self.width, box[2]), min(self.height, box[3])
+        if x0 >= x1 or y0 >= y1:
             return None
+        return x0, y0, x1, y1
+    
+    def _update_frame(self):
+        """Refresh the full-screen BGRX frame; return False if nothing changed.
+        
+        With X Damage only the damaged bounding box is re-read; without it
+        the whole frame is read and compared by hash. Called with the
+        capture lock held.
+        """
+        if self._damage is None:
+            frame = self._grab(0, 0, self.width, self.height)
+            digest = hash_buffer(frame.data)
+            if self._frame is not None and digest == self._frame_hash:
+                return False
+            self._frame = frame
+            self._frame_hash = digest
+            self._frame_gen += 1
+            return True
+        
+        box = self._collect_damage()
+        
+        if self._frame is None:
+            # First frame: read everything
+            frame = self._grab(0, 0, self.width, self.height)
+            self._frame = frame if frame.flags.writeable else frame.copy()
+            self._frame_gen += 1
+            return True
+        if box is None:
+            return False
+        
+        x0, y0, x1, y1 = box
+        self._frame[y0:y1, x0:x1] = self._grab(x0, y0, x1 - x0, y1 - y0)
+        self._frame_gen += 1
+        return True
+    
+    def _grab(self, x, y, width, height):
+        """Read a screen rectangle as a (height, width, 4) BGRX array."""
+        if self._mss is not None:
+            sct = getattr(self._mss, 'sct', None)
+            if sct is None:
+                sct = self._mss.sct = mss.mss()
+            shot = sct.grab({'left': x, 'top': y, 'width': width, 'height': height})
+            return np.frombuffer(shot.raw, dtype=np.uint8).reshape((height, width, 4))
+        
+        raw = self.root.get_image(x, y, width, height, X.ZPixmap, 0xffffffff)
+        return np.frombuffer(raw.data, dtype=np.uint8).reshape((height, width, 4))
+    
+    def _encode_jpeg(self, frame):
+        """Encode a (height, width, 4) BGRX frame to JPEG bytes through a reused buffer."""
+        with self._encode_lock:
+            return self._encode_jpeg_locked(frame)
+    
+    def _encode_jpeg_locked(self, frame):
+        if self._tj is not None:
+            size = self._tj.buffer_size(frame, TJSAMP_420)
+            if len(self._jpeg_buf) < size:
+                self._jpeg_buf = bytearray(size)
+            _, nbytes = self._tj.encode(frame, quality=70, pixel_format=TJPF_BGRX,
+                                        jpeg_subsample=TJSAMP_420, dst=self._jpeg_buf)
+            return bytes(memoryview(self._jpeg_buf)[:nbytes])
+        
+        height, width = frame.shape[:2]
+        img = Image.frombuffer('RGB', (width, height), frame, 'raw', 'BGRX', 0, 1)
+        buf = self._buf
+        buf.seek(0)
+        buf.truncate()
+        # 4:2:0 chroma, baseline; optimize=False skips libjpeg's second Huffman pass
+        img.save(buf, format='JPEG', quality=70, subsampling=2, optimize=False)
+        return buf.getvalue()
     
     def get_screen_size(self, screen_idx=0):
         """Get the size of the screen."""
@@ -149,6 +452,7 @@ class LinuxScreenController:
     
     def __del__(self):
         """Clean up resources."""
+        self._pipeline = None
         if hasattr(self, 'display') and self.display is not None:
             try:
                 self.display.close()
@@ -1,28 +1,92 @@
 """
 Windows-specific screen capture implementation.
 """
+import ctypes
+from ctypes import wintypes
 import numpy as np
+import pywintypes
 import win32gui
 import win32ui
 import win32con
 import win32api
 import io
-import sys
-import importlib
+import time
+import functools
+import queue
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-# Ensure system platform module is loaded before wand
-if 'platform' in sys.modules:
-    del sys.modules['platform']
-platform = importlib.import_module('platform')
+from PIL import Image
 
-from wand.image import Image
+from server.platform_local.common.tilecache import TileCache, hash_buffer
 
-def get_screens():
-    """Get information about all connected screens."""
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGRX, TJSAMP_420
+    TURBOJPEG_AVAILABLE = True
+except ImportError:
+    TURBOJPEG_AVAILABLE = False
+
+try:
+    import dxcam
+    DXCAM_AVAILABLE = True
+except ImportError:
+    DXCAM_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Errors a GDI capture can raise transiently (desktop switch, locked session)
+_CAPTURE_ERRORS = (pywintypes.error, win32ui.error, OSError)
+
+class BITMAPINFOHEADER(ctypes.Structure):
+    _fields_ = [
+        ('biSize', wintypes.DWORD),
+        ('biWidth', wintypes.LONG),
+        ('biHeight', wintypes.LONG),
+        ('biPlanes', wintypes.WORD),
+        ('biBitCount', wintypes.WORD),
+        ('biCompression', wintypes.DWORD),
+        ('biSizeImage', wintypes.DWORD),
+        ('biXPelsPerMeter', wintypes.LONG),
+        ('biYPelsPerMeter', wintypes.LONG),
+        ('biClrUsed', wintypes.DWORD),
+        ('biClrImportant', wintypes.DWORD),
+    ]
+
+gdi32 = ctypes.windll.gdi32
+gdi32.CreateDIBSection.argtypes = [wintypes.HDC, ctypes.POINTER(BITMAPINFOHEADER), wintypes.UINT,
+                                   ctypes.POINTER(ctypes.c_void_p), wintypes.HANDLE, wintypes.DWORD]
+gdi32.CreateDIBSection.restype = wintypes.HBITMAP
+
+def _create_dib_section(hdc, width, height):
+    """
+    Create a top-down 32 bpp DIB section.
+    
+    Returns:
+        tuple: (bitmap handle, (height, width, 4) uint8 array viewing its pixels)
+    """
+    header = BITMAPINFOHEADER()
+    header.biSize = ctypes.sizeof(BITMAPINFOHEADER)
+    header.biWidth = width
+    header.biHeight = -height  # negative: rows top to bottom
+    header.biPlanes = 1
+    header.biBitCount = 32
+    header.biCompression = win32con.BI_RGB
+    bits = ctypes.c_void_p()
+    hbitmap = gdi32.CreateDIBSection(hdc, ctypes.byref(header), win32con.DIB_RGB_COLORS,
+                                     ctypes.byref(bits), None, 0)
+    if not hbitmap:
+        raise ctypes.WinError()
+    pixels = (ctypes.c_uint8 * (width * height * 4)).from_address(bits.value)
+    return hbitmap, np.frombuffer(pixels, dtype=np.uint8).reshape((height, width, 4))
+
+def _enum_screens():
+    """Enumerate the connected screens."""
     monitors = []
     def callback(hm, hdc, rect, data):
         monitor_info = win32gui.GetMonitorInfo(hm)
         work_area = monitor_info['Work']
+        monitor_area = monitor_info['Monitor']
         monitors.append({
             'left': work_area[0],
             'top': work_area[1],
@@ -30,6 +94,9 @@ def get_screens():
             'bottom': work_area[3],
             'width': work_area[2] - work_area[0],
             'height': work_area[3] - work_area[1],
+            # Work area origin relative to the monitor (i.e. the DXGI output)
+            'offset_x': work_area[0] - monitor_area[0],
+            'offset_y': work_area[1] - monitor_area[1],
             'is_primary': monitor_info.get('Flags', 0) == win32con.MONITORINFOF_PRIMARY
         })
         return True
@@ -48,72 +115,385 @@ def get_screens():
             'bottom': height,
             'width': width,
             'height': height,
+            'offset_x': 0,
+            'offset_y': 0,
             'is_primary': True
         })
     return monitors
 
+# Bumped on WM_DISPLAYCHANGE; keys the cached enumeration
+_screens_generation = 0
+_watcher_lock = threading.Lock()
+_watcher_started = False
+
+@functools.lru_cache(maxsize=1)
+def _cached_screens(generation):
+    return _enum_screens()
+
+def invalidate_screens():
+    """Force the next get_screens() call to enumerate the screens again."""
+    global _screens_generation
+    _screens_generation += 1
+
+def _watch_display_changes():
+    """Pump messages for a hidden window that invalidates the screen cache on display changes."""
+    def wnd_proc(hwnd, msg, wparam, lparam):
+        if msg == win32con.WM_DISPLAYCHANGE:
+            invalidate_screens()
+        return win32gui.DefWindowProc(hwnd, msg, wparam, lparam)
+    
+    try:
+        wc = win32gui.WNDCLASS()
+        wc.lpfnWndProc = wnd_proc
+        wc.lpszClassName = 'RemoteControlDisplayWatcher'
+        wc.hInstance = win32api.GetModuleHandle(None)
+        win32gui.RegisterClass(wc)
+        # A hidden top-level window: message-only windows miss broadcasts
+        win32gui.CreateWindow(wc.lpszClassName, '', 0, 0, 0, 0, 0, 0, 0, wc.hInstance, None)
+        win32gui.PumpMessages()
+    except Exception:
+        logger.exception("Display change watcher failed; screen layout will not refresh")
+
+def get_screens():
+    """Get information about all connected screens (cached until the display layout changes)."""
+    global _watcher_started
+    if not _watcher_started:
+        with _watcher_lock:
+            if not _watcher_started:
+                _watcher_started = True
+                threading.Thread(target=_watch_display_changes, daemon=True).start()
+    return _cached_screens(_screens_generation)
+
 class WindowsScreenController:
     """Windows screen capture and control."""
     
-    def __init__(self):
-        self.screens = get_screens()
-        self.primary_screen = next((s for s in self.screens if s['is_primary']), self.screens[0])
+    def __init__(self, encoder=None):
+        """
+        Args:
+            encoder: 'nvenc' to return H.264 NAL units from capture_screen
+                instead of JPEG images
+        """
+        self.encoder = encoder
+        self._nvenc = None
+        if encoder == 'nvenc':
+            try:
+                from server.platform_local.common.nvenc_encoder import NvencEncoder
+                self._nvenc = NvencEncoder()
+            except Exception as e:
+                logger.warning(f"NVENC not available, using image encoding: {e}")
+                self.encoder = None
+        # libjpeg-turbo encodes the BGRX bitmap bits directly
+        self._tj = None
+        if TURBOJPEG_AVAILABLE:
+            try:
+                self._tj = TurboJPEG()
+            except Exception as e:
+                logger.info(f"libjpeg-turbo not available, using PIL for JPEG: {e}")
+        # GDI objects are created once and reused across frames. BitBlt
+        # writes into a DIB section whose pixels are viewed by a numpy array,
+        # recreated only when the capture size changes; frames therefore
+        # alias that memory, so capture and encode hold the capture lock
+        self._hwin = win32gui.GetDesktopWindow()
+        self._hwindc = win32gui.GetWindowDC(self._hwin)
+        self._srcdc = win32ui.CreateDCFromHandle(self._hwindc)
+        self._memdc = self._srcdc.CreateCompatibleDC()
+        self._bitmap = None  # (width, height, HBITMAP, frame view) selected into _memdc
+        self._default_bitmap = None
+        self._capture_lock = threading.Lock()
+        # Reused output buffers for the Pillow JPEG fallback, one per thread
+        self._bufs = threading.local()
+        # DXGI Desktop Duplication reads the composited primary output from
+        # the GPU and reports when nothing changed; GDI is the fallback
+        # (secondary screens, RDP sessions without duplication)
+        self._dxgi = None
+        # dxcam reports "no new frame" only to the caller that grabs first, so
+        # the newest full-output frame is kept here and bumped a generation
+        # on every update; each consumer remembers the generation it used
+        self._dxgi_frame = None
+        self._dxgi_gen = 0
+        self._last_frame = None  # (capture rect, DXGI generation or None, pixel hash, encoded bytes)
+        if DXCAM_AVAILABLE:
+            try:
+                self._dxgi = dxcam.create(output_color='BGRA')
+            except Exception as e:
+                logger.info(f"DXGI duplication not available, using GDI: {e}")
+        # Dirty-tile deltas per screen, see capture_dirty_tiles()
+        self._delta_tiles = {}
+        self._delta_gens = {}
+        # Full-screen JPEG pipeline for the first screen: a capture thread
+        # copies frames into a ring of preallocated buffers and hands them to
+        # a pool of encoder threads; capture_screen() returns the newest JPEG.
+        # The pipeline stops once no screenshot was requested for
+        # pipeline_idle_timeout
+        self.frame_interval = 1 / 30
+        self.pipeline_idle_timeout = 2.0
+        self._ring = [None] * 3
+        self._free_slots = queue.Queue()
+        for slot in range(len(self._ring)):
+            self._free_slots.put(slot)
+        self._frame_seq = 0
+        self._jpeg_seq = 0
+        self._pipeline_hash = None  # Hash of the last GDI frame sent to the encoders
+        self._pipeline_gen = None  # DXGI generation of the last frame sent to the encoders
+        self._latest_jpeg = None
+        self._jpeg_ready = threading.Condition()  # Also guards the pipeline state
+        self._pipeline = None  # Token of the running pipeline; replaced on restart
+        self._last_request = 0.0
+    
+    @property
+    def screens(self):
+        """Connected screens; a cached lookup that follows display changes."""
+        return get_screens()
+    
+    @property
+    def primary_screen(self):
+        screens = get_screens()
+        return next((s for s in screens if s['is_primary']), screens[0])
     
     def capture_screen(self, screen_idx=0, region=None):
         """Capture a screenshot of the specified screen or region."""
-        try:
-            if screen_idx >= len(self.screens):
-                screen_idx = 0
-                
-            screen = self.screens[screen_idx]
-            hwin = win32gui.GetDesktopWindow()
+        if screen_idx == 0 and not region and self._nvenc is None:
+            with self._jpeg_ready:
+                self._last_request = time.monotonic()
+                if self._pipeline is None:
+                    self._start_pipeline()
+                if self._jpeg_ready.wait_for(lambda: self._latest_jpeg is not None, timeout=1.0):
+                    return self._latest_jpeg
+            # The pipeline has not produced a frame yet (e.g. still starting
+            # up); capture this one synchronously
+        
+        if screen_idx >= len(self.screens):
+            screen_idx = 0
             
-            left = screen['left']
-            top = screen['top']
-            width = screen['width']
-            height = screen['height']
+        screen = self.screens[screen_idx]
+        
+        left = screen['left']
+        top = screen['top']
+        width = screen['width']
+        height = screen['height']
+        
+        if region:
+            left += region[0]
+            top += region[1]
+            width = min(region[2], width - region[0])
+            height = min(region[3], height - region[1])
+        
+        rect = (left, top, width, height)
+        with self._capture_lock:
+            gen = None
+            grabbed = self._grab_dxgi(screen, left, top, width, height)
+            if grabbed is not None:
+                img_data, gen = grabbed
+                if self._nvenc is None and self._last_frame is not None and \
+                        self._last_frame[:2] == (rect, gen):
+                    # No new frame since the last capture of this rect; skip encoding
+                    return self._last_frame[3]
+            else:
+                try:
+                    img_data = self._capture_gdi(left, top, width, height)
+                except _CAPTURE_ERRORS:
+                    logger.exception("Error capturing screen")
+                    return None
             
-            if region:
-                left += region[0]
-                top += region[1]
-                width = min(region[2], width - region[0])
-                height = min(region[3], height - region[1])
+            if self._nvenc is not None:
+                # Encode on the GPU straight from the BGRX bits
+                return self._nvenc.encode(img_data)
             
-            hwindc = win32gui.GetWindowDC(hwin)
-            srcdc = win32ui.CreateDCFromHandle(hwindc)
-            memdc = srcdc.CreateCompatibleDC()
-            bmp = win32ui.CreateBitmap()
-            bmp.CreateCompatibleBitmap(srcdc, width, height)
-            memdc.SelectObject(bmp)
-            memdc.BitBlt((0, 0), (width, height), srcdc, (left, top), win32con.SRCCOPY)
-            
-            bmpinfo = bmp.GetInfo()
-            bmpstr = bmp.GetBitmapBits(True)
-            
-            # Convert to wand Image
-            img_data = np.frombuffer(bmpstr, dtype=np.uint8).reshape((height, width, 4))
-            
-            # Convert BGRX to RGB (remove the X channel)
-            rgb_data = img_data[:, :, [2, 1, 0]]  # BGR -> RGB
-            
-            # Create wand image from numpy array
-            with Image.from_array(rgb_data) as img:
-                img_byte_arr = io.BytesIO()
-                img.format = 'png'
-                img.save(img_byte_arr)
-                result = img_byte_arr.getvalue()
+            # A static screen yields identical pixels; reuse the last encode
+            digest = hash_buffer(img_data.data)
+            if self._last_frame is not None and self._last_frame[0] == rect and \
+                    self._last_frame[2] == digest:
+                result = self._last_frame[3]
+            else:
+                result = self._encode(img_data)
+            self._last_frame = (rect, gen, digest, result)
+            return result
+    
+    def _start_pipeline(self):
+        """Start the capture thread and encoder pool; called with _jpeg_ready held."""
+        token = self._pipeline = object()
+        self._latest_jpeg = None
+        self._pipeline_hash = None
+        self._pipeline_gen = None
+        encoders = ThreadPoolExecutor(max_workers=2, thread_name_prefix='jpeg-encoder')
+        threading.Thread(target=self._capture_loop, args=(token, encoders), daemon=True).start()
+    
+    def _capture_loop(self, token, encoders):
+        """Copy frames of the first screen into free ring slots at the frame interval until idle."""
+        while True:
+            with self._jpeg_ready:
+                if time.monotonic() - self._last_request > self.pipeline_idle_timeout:
+                    # Nobody is asking for screenshots; stop capturing and encoding
+                    self._pipeline = None
+                    self._latest_jpeg = None
+                    break
+            started = time.monotonic()
+            screen = self.screens[0]
+            left, top = screen['left'], screen['top']
+            width, height = screen['width'], screen['height']
+            try:
+                slot = self._free_slots.get_nowait()
+            except queue.Empty:
+                slot = None  # Both encoders are busy; drop this frame
             
-            # Clean up
-            srcdc.DeleteDC()
-            memdc.DeleteDC()
-            win32gui.ReleaseDC(hwin, hwindc)
-            win32gui.DeleteObject(bmp.GetHandle())
+            if slot is not None:
+                img_data = None
+                try:
+                    with self._capture_lock:
+                        grabbed = self._grab_dxgi(screen, left, top, width, height)
+                        if grabbed is not None:
+                            img_data, gen = grabbed
+                            if gen == self._pipeline_gen and self._latest_jpeg is not None:
+                                img_data = None  # No new frame; nothing to encode
+                            else:
+                                self._pipeline_gen = gen
+                        else:
+                            img_data = self._capture_gdi(left, top, width, height)
+                            digest = hash_buffer(img_data.data)
+                            if digest == self._pipeline_hash and self._latest_jpeg is not None:
+                                img_data = None  # Screen unchanged; nothing to encode
+                            else:
+                                self._pipeline_hash = digest
+                        if img_data is not None:
+                            buf = self._ring[slot]
+                            if buf is None or buf.shape != img_data.shape:
+                                buf = self._ring[slot] = np.empty_like(img_data)
+                            np.copyto(buf, img_data)
+                except Exception:
+                    # Keep the capture thread alive through transient failures
+                    logger.exception("Error capturing screen")
+                    img_data = None
+                
+                if img_data is None:
+                    # Nothing new on screen (or the capture failed)
+                    self._free_slots.put(slot)
+                else:
+                    self._frame_seq += 1
+                    encoders.submit(self._encode_slot, slot, self._frame_seq, token)
             
-            return result
+            remaining = self.frame_interval - (time.monotonic() - started)
+            if remaining > 0:
+                time.sleep(remaining)
+        encoders.shutdown(wait=False)
+    
+    def _encode_slot(self, slot, seq, token):
+        """Encode a ring slot and publish it unless a newer frame already was."""
+        try:
+            jpeg = self._encode(self._ring[slot])
+        except Exception:
+            logger.exception("Error encoding screen")
+            jpeg = None
+        finally:
+            self._free_slots.put(slot)
+        if jpeg is not None:
+            with self._jpeg_ready:
+                if self._pipeline is token and seq > self._jpeg_seq:
+                    self._jpeg_seq = seq
+                    self._latest_jpeg = jpeg
+                    self._jpeg_ready.notify_all()
+    
+    def capture_dirty_tiles(self, screen_idx=0):
+        """
+        Capture a screen and JPEG-encode only the tiles that changed.
+        
+        The first call returns every tile; a static screen returns an
+        empty list.
+        
+        Returns:
+            list: (x, y, width, height, jpeg_bytes) per changed 64x64 tile,
+                relative to the screen, or None on failure
+        """
+        if screen_idx >= len(self.screens):
+            screen_idx = 0
+        screen = self.screens[screen_idx]
+        left, top = screen['left'], screen['top']
+        width, height = screen['width'], screen['height']
+        
+        with self._capture_lock:
+            tiles = self._delta_tiles.get(screen_idx)
+            grabbed = self._grab_dxgi(screen, left, top, width, height)
+            if grabbed is not None:
+                img_data, gen = grabbed
+                if tiles is not None and self._delta_gens.get(screen_idx) == gen:
+                    # No new frame since this screen's last delta
+                    return []
+                self._delta_gens[screen_idx] = gen
+            else:
+                self._delta_gens.pop(screen_idx, None)
+                try:
+                    img_data = self._capture_gdi(left, top, width, height)
+                except _CAPTURE_ERRORS:
+                    logger.exception("Error capturing screen")
+                    return None
             
-        except Exception as e:
-            print(f"Error capturing screen: {e}")
+            if tiles is None:
+                tiles = self._delta_tiles[screen_idx] = TileCache(tile_size=64)
+            return [(x, y, w, h, self._encode(np.ascontiguousarray(img_data[y:y + h, x:x + w])))
+                    for x, y, w, h in tiles.dirty_rects(img_data)]
+    
+    def _grab_dxgi(self, screen, left, top, width, height):
+        """
+        Crop a rectangle from the newest DXGI frame of the primary output.
+        
+        Called with the capture lock held. The frame is the last one
+        duplication delivered, so it is current even when another consumer
+        already took the "new frame" notification.
+        
+        Returns:
+            tuple: (pixels, frame generation), or None if duplication is unavailable
+        """
+        if self._dxgi is None or not screen['is_primary']:
+            return None
+        try:
+            img_data = self._dxgi.grab()
+        except Exception:
+            img_data = None
+        if img_data is not None:
+            self._dxgi_frame = img_data
+            self._dxgi_gen += 1
+        elif self._dxgi_frame is None:
             return None
+        x = left - screen['left'] + screen['offset_x']
+        y = top - screen['top'] + screen['offset_y']
+        return np.ascontiguousarray(self._dxgi_frame[y:y + height, x:x + width]), self._dxgi_gen
+    
+    def _capture_gdi(self, left, top, width, height):
+        """
+        BitBlt a desktop rectangle into the DIB section.
+        
+        Called with the capture lock held; the returned (height, width, 4)
+        BGRX array is overwritten by the next capture.
+        """
+        if self._bitmap is None or self._bitmap[:2] != (width, height):
+            hdc = self._memdc.GetSafeHdc()
+            hbitmap, frame = _create_dib_section(hdc, width, height)
+            previous = win32gui.SelectObject(hdc, hbitmap)
+            if self._bitmap is not None:
+                win32gui.DeleteObject(self._bitmap[2])
+            else:
+                self._default_bitmap = previous
+            self._bitmap = (width, height, hbitmap, frame)
+        self._memdc.BitBlt((0, 0), (width, height), self._srcdc, (left, top), win32con.SRCCOPY)
+        # Make sure GDI has finished writing before the pixels are read
+        gdi32.GdiFlush()
+        return self._bitmap[3]
+    
+    def _encode(self, img_data):
+        """Encode a BGRX/BGRA frame to JPEG bytes."""
+        if self._tj is not None:
+            return self._tj.encode(img_data, quality=70, pixel_format=TJPF_BGRX,
+                                   jpeg_subsample=TJSAMP_420)
+        
+        # Pillow's BGRX raw decoder drops the X channel in C, in one pass
+        height, width = img_data.shape[:2]
+        img = Image.frombuffer('RGB', (width, height), img_data, 'raw', 'BGRX', 0, 1)
+        buf = getattr(self._bufs, 'buf', None)
+        if buf is None:
+            buf = self._bufs.buf = io.BytesIO()
+        buf.seek(0)
+        buf.truncate()
+        img.save(buf, format='JPEG', quality=70, subsampling=2, optimize=False)
+        return buf.getvalue()
     
     def get_screen_size(self, screen_idx=0):
         """Get the size of the specified screen."""
@@ -126,3 +506,18 @@ class WindowsScreenController:
     def get_screen_count(self):
         """Get the number of connected screens."""
         return len(self.screens)
+    
+    def __del__(self):
+        """Release the cached GDI objects."""
+        self._pipeline = None
+        try:
+            if self._dxgi is not None:
+                self._dxgi.release()
+            if self._bitmap is not None:
+                win32gui.SelectObject(self._memdc.GetSafeHdc(), self._default_bitmap)
+                win32gui.DeleteObject(self._bitmap[2])
+            self._memdc.DeleteDC()
+            self._srcdc.DeleteDC()
+            win32gui.ReleaseDC(self._hwin, self._hwindc)
+        except Exception:
+            pass
@@ -5,20 +5,52 @@ Handles incoming connections, authentication, and remote control commands.
 """
 import os
 import sys
+import errno
+import hmac
 import json
+import shutil
 import socket
+import struct
+import selectors
+import asyncio
 import logging
 import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Optional, Tuple, Any
+from typing import Callable, Dict, Optional, Tuple, Any
 
 # Add parent directory to path for module imports
 sys.path.append(str(Path(__file__).parent.parent))
 
-from common.protocol import Message, MessageType, AuthMessage, MouseEvent, KeyEvent
+from common.protocol import (Message, MessageType, AuthMessage, MouseEvent, KeyEvent,
+                             MOUSE_MOVE_STRUCT, MOUSE_EVENT_STRUCT)
 from common.security import SecurityManager
 from common.file_transfer import FileTransfer, FileTransferMessage
+from common.utils import json_dumps, json_loads
+
+try:
+    import psutil  # Only gates the extended fields of INFO replies
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+# Platform-specific readers, picked once at import
+if os.name == 'nt':
+    import ctypes
+
+    _GetTickCount64 = ctypes.windll.kernel32.GetTickCount64
+    _GetTickCount64.restype = ctypes.c_ulonglong
+
+    def _read_uptime() -> float:
+        """System uptime in seconds."""
+        return _GetTickCount64() / 1000.0
+else:
+    def _read_uptime() -> float:
+        """System uptime in seconds."""
+        with open('/proc/uptime', 'rb') as f:
+            return float(f.readline().split()[0])
 
 # Configure logging
 import os
@@ -38,24 +70,282 @@ logging.basicConfig(
 )
 logger = logging.getLogger('RemoteControlServer')
 
+# Message header: type and payload length, both big-endian uint32
+_HDR = struct.Struct('>II')
+# Replies are batched per connection until the client goes quiet or this
+# many bytes are pending; larger payloads are written without copying
+OUTBOUND_FLUSH_SIZE = 64 * 1024
+# Connections served at once; further clients wait in the listen backlog
+MAX_CLIENTS = 64
+# Threads running blocking message handlers for all clients
+HANDLER_WORKERS = 16
+# Threads receiving PUT_FILE bodies; further uploads wait for a free one
+UPLOAD_WORKERS = 4
+# Kernel buffer size for client sockets, sized so a full-screen frame fits
+# in one send. Linux caps requests at net.core.wmem_max / rmem_max; raise
+# those (e.g. sysctl -w net.core.wmem_max=12582912) to get the full size.
+SOCKET_BUFFER_SIZE = 4 * 1024 * 1024
+# How often login timestamps are written back to users.json, in seconds
+USERS_FLUSH_INTERVAL = 30.0
+# Authentication attempts per client address: burst size and refill per second
+AUTH_BURST = 5
+AUTH_RATE = 0.5
+# Addresses tracked for rate limiting; the least recently seen are dropped
+AUTH_BUCKETS_MAX = 1024
+# Successful password checks remembered to skip PBKDF2 on reconnect bursts
+AUTH_CACHE_SIZE = 256
+AUTH_CACHE_TTL = 60.0  # seconds
+# How long disk usage and uptime readings are reused, in seconds
+SYSTEM_STATS_TTL = 1.0
+# Linux only
+_TCP_QUICKACK = getattr(socket, 'TCP_QUICKACK', None)
+_TCP_CORK = getattr(socket, 'TCP_CORK', None)
+# Uploads: bytes moved per splice/recv call, and how long the client may stall
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_IDLE_TIMEOUT = 30.0
+# Default cap on a single PUT_FILE (--max-upload-mb), in bytes
+MAX_UPLOAD_SIZE = 1024 * 1024 * 1024
+# Fixed replies, built once instead of per message
+_ERR_NOT_AUTHENTICATED = (MessageType.ERROR, b"Not authenticated")
+_AUTH_RATE_LIMITED = (MessageType.AUTH_RESPONSE,
+                      json_dumps({'success': False, 'message': 'Rate limited: too many authentication attempts, try again later'}), None)
+_ERR_UNKNOWN_TYPE = (MessageType.ERROR, b"Unknown message type")
+_OK_CLIPBOARD = (MessageType.SUCCESS, b"Clipboard updated")
+_OK_SYSTEM_COMMAND = (MessageType.SUCCESS, b"System command handled")
+_ERR_NO_SCREEN = (MessageType.ERROR, b"Screen controller not available")
+_ERR_SCREENSHOT = (MessageType.ERROR, b"Failed to capture screenshot")
+_ERR_NO_INPUT = (MessageType.ERROR, b"Input controller not available")
+_OK_MOUSE_MOVE = (MessageType.SUCCESS, b"Mouse moved successfully")
+_OK_MOUSE_CLICK = (MessageType.SUCCESS, b"Mouse click handled")
+_ERR_MOUSE_CLICK = (MessageType.ERROR, b"Failed to send mouse click")
+_OK_MOUSE_RELEASE = (MessageType.SUCCESS, b"Mouse release ignored")
+_ERR_KEY_PRESS = (MessageType.ERROR, b"Failed to send key press")
+_OK_KEY_EVENT = (MessageType.INFO, b"Key event handled successfully")
+_ERR_NO_FILE_TRANSFER = (MessageType.ERROR, b"File transfer not available")
+_ERR_LIST_DIRECTORY = (MessageType.ERROR, b"Failed to list directory")
+# Resolved once so the per-message checks compare plain ints
+_AUTH = MessageType.AUTH.value
+_DISCONNECT = MessageType.DISCONNECT.value
+_MOUSE_MOVE = MessageType.MOUSE_MOVE.value
+# Per-connection receive buffer; larger payloads get their own buffer
+RECV_BUFFER_SIZE = 256 * 1024
+
+class _FileReply:
+    """A reply payload streamed from an open file rather than held in memory."""
+
+    def __init__(self, file, offset: int, count: int):
+        self.file = file
+        self.offset = offset
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+def _recv_to_file(sock: socket.socket, file, count: int) -> int:
+    """
+    Move count bytes from a non-blocking socket into file.
+
+    Runs on a worker thread. On Linux the bytes are spliced through a pipe,
+    so they go from the socket to the page cache without a copy in user
+    space; elsewhere, and for files opened for appending (splice rejects
+    O_APPEND), they are received into one reused buffer.
+
+    Returns:
+        int: Bytes received; fewer than count if the client closed first
+    """
+    received = 0
+    with selectors.DefaultSelector() as selector:
+        selector.register(sock, selectors.EVENT_READ)
+
+        def wait_readable() -> None:
+            if not selector.select(UPLOAD_IDLE_TIMEOUT):
+                raise TimeoutError(f"No upload data for {UPLOAD_IDLE_TIMEOUT} seconds")
+
+        if hasattr(os, 'splice') and 'a' not in file.mode:
+            read_end, write_end = os.pipe()
+            try:
+                while received < count:
+                    try:
+                        n = os.splice(sock.fileno(), write_end, min(count - received, UPLOAD_CHUNK_SIZE),
+                                      flags=os.SPLICE_F_MOVE)
+                    except BlockingIOError:
+                        wait_readable()
+                        continue
+                    if not n:
+                        return received
+                    received += n
+                    try:
+                        while n:
+                            n -= os.splice(read_end, file.fileno(), n, flags=os.SPLICE_F_MOVE)
+                    except OSError as e:
+                        # Not every file system supports splice; move what is
+                        # already in the pipe, then finish with plain copies
+                        if e.errno not in (errno.EINVAL, errno.ENOSYS):
+                            raise
+                        while n:
+                            chunk = os.read(read_end, n)
+                            file.write(chunk)
+                            n -= len(chunk)
+                        break
+                else:
+                    return received
+            except OSError as e:
+                # The socket side refused splice before anything was moved
+                if e.errno not in (errno.EINVAL, errno.ENOSYS) or received:
+                    raise
+            finally:
+                os.close(read_end)
+                os.close(write_end)
+
+        buf = bytearray(min(count, UPLOAD_CHUNK_SIZE))
+        view = memoryview(buf)
+        while received < count:
+            try:
+                n = sock.recv_into(view[:count - received])
+            except BlockingIOError:
+                wait_readable()
+                continue
+            if not n:
+                break
+            file.write(view[:n])
+            received += n
+    return received
+
+class _FileUpload:
+    """A PUT_FILE in progress: size raw bytes follow the request on the socket.
+
+    file is None when the upload was refused and error is the reply. A
+    refused body is never read, so the connection is closed after the reply.
+    """
+
+    def __init__(self, path: str, size: int, file=None, error: Optional[Tuple[MessageType, bytes]] = None):
+        self.path = path
+        self.size = size
+        self.file = file
+        self.error = error
+
+class _RecvBuffer:
+    """Receive buffer for one connection.
+
+    Each read takes as much as the socket has, so a burst of small
+    messages arrives with one recv_into; messages are then parsed from
+    buf[start:end] in place.
+    """
+
+    def __init__(self, size: int):
+        self.buf = bytearray(size)
+        self.view = memoryview(self.buf)
+        self.start = 0  # First unread byte
+        self.end = 0  # End of received data
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def free_space(self) -> memoryview:
+        """Return the writable tail, first moving unread bytes to the front."""
+        if self.start:
+            unread = self.end - self.start
+            self.buf[:unread] = self.view[self.start:self.end]
+            self.start, self.end = 0, unread
+        return self.view[self.end:]
+
+    def take(self, n: int) -> bytes:
+        """Remove and return the next n buffered bytes."""
+        data = bytes(self.view[self.start:self.start + n])
+        self.start += n
+        return data
+
+    def take_mouse_moves(self, data: bytes) -> bytes:
+        """
+        Consume the complete mouse moves buffered right behind the current one.
+
+        Moves are absolute, so only the last of a burst matters; the others
+        are dropped without a reply instead of each taking a round through
+        the executor and the input controller.
+
+        Returns:
+            bytes: Payload of the newest move
+        """
+        while self.end - self.start >= _HDR.size:
+            msg_type, data_len = _HDR.unpack_from(self.buf, self.start)
+            if msg_type != _MOUSE_MOVE or self.end - self.start < _HDR.size + data_len:
+                break
+            self.start += _HDR.size
+            data = self.take(data_len)
+        return data
+
 class RemoteControlServer:
     """Main server class for handling remote control connections."""
     
-    def __init__(self, host: str = '0.0.0.0', port: int = 5000):
+    def __init__(self, host: str = '0.0.0.0', port: int = 5000,
+                 max_upload_size: int = MAX_UPLOAD_SIZE):
         """Initialize the server."""
         self.host = host
         self.port = port
+        self.max_upload_size = max_upload_size  # Largest PUT_FILE accepted, in bytes
         self.running = False
-        self.clients: Dict[str, Dict] = {}
+        self.clients: Dict[str, Dict] = {}  # Authenticated sessions by client_id
+        # Written from handler threads (auth) and the event loop (disconnect)
+        self._clients_lock = threading.Lock()
         self.auth_required = True
         self.server_socket: Optional[socket.socket] = None
+        self._client_tasks = set()  # Keeps running handle_client tasks referenced
+        self._handler_pool = ThreadPoolExecutor(max_workers=HANDLER_WORKERS,
+                                                thread_name_prefix='rc-handler')
+        # Upload bodies can take up to UPLOAD_IDLE_TIMEOUT per read, so they get
+        # their own threads and cannot starve screenshots and input
+        self._upload_pool = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS,
+                                               thread_name_prefix='rc-upload')
+        # Password checks get their own threads (pbkdf2_hmac releases the GIL),
+        # so a burst of logins cannot hold up screenshots and input
+        self._auth_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1,
+                                             thread_name_prefix='rc-auth')
+        # Client address -> (tokens, last refill time); only touched on the event loop
+        self._auth_buckets = OrderedDict()
         self.security_manager = SecurityManager()
         self.allowed_users = self._load_users()
+        self._users_lock = threading.Lock()  # Guards allowed_users while it is saved
+        self._users_dirty = False  # Login times changed since the last save
         self.os_platform = 'windows' if os.name == 'nt' else 'linux'
         self.screen_controller = self._get_screen_controller()
+        self.frame_broadcaster = self._get_frame_broadcaster()
         self.input_controller = self._get_input_controller()
+        self.input_dispatcher = self._get_input_dispatcher()
+        if self.input_dispatcher:
+            # Bound once; these run for every input event
+            self._queue_mouse_move = self.input_dispatcher.move
+            self._dispatch_input = self.input_dispatcher.call
         self.file_transfer = FileTransfer()
         self.allowed_directories = self._get_allowed_directories()
+        self._allowed_prefixes = self._build_allowed_prefixes()
+        self._total_ram = None  # Filled on first use; fixed while running
+        # Last readings and when they were taken, reused for SYSTEM_STATS_TTL
+        self._disk_usage = None
+        self._disk_usage_at = 0.0
+        self._uptime = None
+        self._uptime_at = 0.0
+        # (username, stored hash, keyed password digest) -> time verified
+        self._verify_cache = OrderedDict()
+        self._verify_cache_key = os.urandom(32)
+        self._verify_cache_lock = threading.Lock()
+        self._dispatch = self._build_dispatch()
+        self._static_info = self._build_static_info()
+        # Without psutil the INFO reply never changes, so it is encoded once
+        self._static_info_json = None if PSUTIL_AVAILABLE else json_dumps(self._static_info)
+
+    def _build_dispatch(self) -> Dict[int, Callable[[bytes, socket.socket], Tuple[MessageType, bytes]]]:
+        """Map message type values to handlers taking (data, client_socket)."""
+        return {
+            MessageType.MOUSE_MOVE.value: lambda data, sock: self._handle_mouse_move(data),
+            MessageType.MOUSE_CLICK.value: lambda data, sock: self._handle_mouse_click(data),
+            MessageType.KEY_EVENT.value: lambda data, sock: self._handle_key_event(data),
+            MessageType.SCREENSHOT.value: lambda data, sock: self._handle_screenshot(),
+            MessageType.FILE_TRANSFER.value: self._handle_file_transfer,
+            MessageType.CLIPBOARD_UPDATE.value: lambda data, sock: self._handle_clipboard_update(data),
+            MessageType.SYSTEM_COMMAND.value: lambda data, sock: self._handle_system_command(data),
+            MessageType.INFO.value: lambda data, sock: self._handle_info(),
+            _DISCONNECT: lambda data, sock: None,  # Client is disconnecting
+        }
 
     def _load_users(self) -> Dict:
         """Load users from a JSON file."""
@@ -88,6 +378,13 @@ class RemoteControlServer:
             logger.error(f"Failed to load screen controller: {e}", exc_info=True)
             return None
 
+    def _get_frame_broadcaster(self):
+        """Share one capture loop between all clients requesting screenshots."""
+        if not self.screen_controller:
+            return None
+        from server.platform_local.common.frame_broadcaster import FrameBroadcaster
+        return FrameBroadcaster(self.screen_controller)
+
     def _get_input_controller(self):
         """Get the appropriate input controller for the platform."""
         try:
@@ -104,38 +401,79 @@ class RemoteControlServer:
             logger.error(f"Failed to load input controller: {e}")
             return None
 
-    def start(self) -> None:
-        """Start the server."""
+    def _get_input_dispatcher(self):
+        """Wrap the input controller so bursts of mouse moves are coalesced."""
+        if not self.input_controller:
+            return None
+        from server.platform_local.common.input_dispatcher import CoalescingInputDispatcher
+        return CoalescingInputDispatcher(self.input_controller)
+
+    async def start(self) -> None:
+        """Start the server and serve clients on the running event loop until stopped.
+
+        Every connection is a task on a single event loop; blocking handlers
+        (screen capture, input injection, password hashing) run in a bounded
+        thread pool. At most MAX_CLIENTS connections are served at once.
+        """
+        loop = asyncio.get_running_loop()
+        client_slots = asyncio.Semaphore(MAX_CLIENTS)
         try:
             self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             self.server_socket.bind((self.host, self.port))
             self.server_socket.listen(5)
+            self.server_socket.setblocking(False)
             self.running = True
             
             logger.info(f"Server started on {self.host}:{self.port}")
             logger.info("Waiting for connections...")
+            users_flusher = asyncio.create_task(self._flush_users_periodically())
             
             while self.running:
+                await client_slots.acquire()
                 try:
-                    client_socket, client_address = self.server_socket.accept()
-                    client_thread = threading.Thread(
-                        target=self.handle_client,
-                        args=(client_socket, client_address),
-                        daemon=True
-                    )
-                    client_thread.start()
+                    # One accept per readiness wakeup, never drained until EAGAIN:
+                    # the listener stays level-triggered, so pending connections
+                    # are picked up on the next pass and clients already being
+                    # served are not starved
+                    client_socket, client_address = await loop.sock_accept(self.server_socket)
+                    client_socket.setblocking(False)
+                    self._configure_client_socket(client_socket)
+                    task = asyncio.create_task(self.handle_client(client_socket, client_address))
+                    self._client_tasks.add(task)
+                    task.add_done_callback(self._client_tasks.discard)
+                    task.add_done_callback(lambda _: client_slots.release())
                 except Exception as e:
+                    client_slots.release()
                     if self.running:
                         logger.error(f"Error accepting connection: {e}")
+            users_flusher.cancel()
         except Exception as e:
             logger.error(f"Server error: {e}")
         finally:
             self.stop()
 
+    def _configure_client_socket(self, client_socket: socket.socket) -> None:
+        """Tune an accepted socket for small interactive messages and large screenshots."""
+        try:
+            # Input events and replies are small; do not hold them back for Nagle
+            client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
+            client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+            # Notice clients that vanished without closing the connection
+            client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        except OSError as e:
+            logger.warning(f"Could not set client socket options: {e}")
+
     def stop(self) -> None:
         """Stop the server and clean up resources."""
         self.running = False
+        if self.input_dispatcher:
+            self.input_dispatcher.close()
+        self._handler_pool.shutdown(wait=False, cancel_futures=True)
+        self._auth_pool.shutdown(wait=False, cancel_futures=True)
+        self._upload_pool.shutdown(wait=False, cancel_futures=True)
+        self._flush_users()
         if self.server_socket:
             try:
                 self.server_socket.close()
@@ -143,44 +481,69 @@ class RemoteControlServer:
                 logger.error(f"Error closing server socket: {e}")
         logger.info("Server stopped")
 
-    def handle_client(self, client_socket: socket.socket, client_address: Tuple[str, int]) -> None:
+    async def handle_client(self, client_socket: socket.socket, client_address: Tuple[str, int]) -> None:
         """Handle a client connection."""
+        loop = asyncio.get_running_loop()
         client_id = f"{client_address[0]}:{client_address[1]}"
         authenticated = False
         username = None
 
-        def _recv_exact(sock: socket.socket, nbytes: int) -> Optional[bytes]:
-            """Receive exactly nbytes from the socket.
+        async def _recv_into(view: memoryview) -> int:
+            """Receive into view, returning the byte count (0 once the client closed)."""
+            try:
+                return client_socket.recv_into(view)
+            except BlockingIOError:
+                # About to wait for the client: write the batched replies first
+                await self._flush_messages(client_socket, out)
+                if _TCP_QUICKACK is not None:
+                    # Linux drops quick-ack mode after a while; re-arm it so
+                    # the next input event is acknowledged without delay
+                    client_socket.setsockopt(socket.IPPROTO_TCP, _TCP_QUICKACK, 1)
+                return await loop.sock_recv_into(client_socket, view)
+
+        async def _fill(n: int) -> bool:
+            """Receive until at least n bytes are buffered; False if the client closed first."""
+            while len(rx) < n:
+                received = await _recv_into(rx.free_space())
+                if not received:
+                    return False
+                rx.end += received
+            return True
 
-            Returns None if the connection is closed before the requested bytes are received.
-            """
-            chunks: list[bytes] = []
-            received = 0
-            while received < nbytes:
-                chunk = sock.recv(nbytes - received)
-                if not chunk:
+        async def _recv_payload(data_len: int) -> Optional[bytes]:
+            """Return the next data_len bytes, or None if the client closed first."""
+            if data_len <= len(rx.buf):
+                return rx.take(data_len) if await _fill(data_len) else None
+            # Too large for the shared buffer: receive straight into its own
+            data = bytearray(data_len)
+            view = memoryview(data)
+            received = len(rx)
+            data[:received] = rx.take(received)
+            while received < data_len:
+                n = await _recv_into(view[received:])
+                if not n:
                     return None
-                chunks.append(chunk)
-                received += len(chunk)
-            return b"".join(chunks)
+                received += n
+            return data
         
+        rx = _RecvBuffer(RECV_BUFFER_SIZE)
+        out = bytearray()  # Replies not yet written to the socket
         try:
             while self.running:
                 # Receive message header (8 bytes: 4 for type, 4 for length)
-                header = _recv_exact(client_socket, 8)
-                if header is None:
+                if not await _fill(_HDR.size):
                     logger.info(f"Client {client_id} disconnected (no header)")
                     break
                     
                 # Parse message
-                msg_type = int.from_bytes(header[:4], byteorder='big')
-                data_len = int.from_bytes(header[4:8], byteorder='big')
+                msg_type, data_len = _HDR.unpack_from(rx.buf, rx.start)
+                rx.start += _HDR.size
                 
                 if data_len < 0 or data_len > 10 * 1024 * 1024:
                     logger.warning(f"Invalid message length from {client_id}: {data_len}")
                     break
 
-                data = _recv_exact(client_socket, data_len)
+                data = await _recv_payload(data_len)
                 if data is None:
                     logger.info(f"Client {client_id} disconnected (incomplete payload, expected {data_len} bytes)")
                     break
@@ -188,26 +551,41 @@ class RemoteControlServer:
                 logger.debug(f"Received from {client_id}: msg_type={msg_type}, data_len={data_len}")
                 
                 # Process message
-                if not authenticated and msg_type != MessageType.AUTH.value:
+                if not authenticated and msg_type != _AUTH:
                     logger.warning(f"Unauthenticated client {client_id} sent non-auth message")
-                    self._send_message(client_socket, MessageType.ERROR, b"Authentication required")
+                    await self._send_message(client_socket, out, MessageType.ERROR, b"Authentication required")
+                    await self._flush_messages(client_socket, out)
                     break
                 
-                response = self._handle_message(msg_type, data, client_socket, client_id, username)
+                if msg_type == _MOUSE_MOVE:
+                    data = rx.take_mouse_moves(data)
+
+                if msg_type == _AUTH:
+                    if self._take_auth_token(client_address[0]):
+                        msg_type, response_data, auth_user = await loop.run_in_executor(
+                            self._auth_pool, self._handle_auth, data, client_id)
+                    else:
+                        logger.warning(f"Authentication rate limit hit by {client_id}")
+                        msg_type, response_data, auth_user = _AUTH_RATE_LIMITED
+                    if auth_user:
+                        authenticated = True
+                        username = auth_user
+                    response = msg_type, response_data
+                else:
+                    response = await loop.run_in_executor(
+                        self._handler_pool, self._handle_message, msg_type, data, client_socket, client_id, username)
+                if response and isinstance(response[1], _FileUpload):
+                    upload = response[1]
+                    if upload.file is None:
+                        # The refused body is not read, so the stream cannot continue
+                        logger.warning(f"Refused upload of {upload.path} from {client_id}")
+                        await self._send_message(client_socket, out, *upload.error)
+                        await self._flush_messages(client_socket, out)
+                        break
+                    response = await self._receive_upload(client_socket, rx, upload)
                 if response:
                     msg_type, response_data = response
-                    # Update authentication status if this was an AUTH message
-                    if msg_type == MessageType.AUTH_RESPONSE:
-                        try:
-                            response_data_str = response_data.decode('utf-8')
-                            response_json = json.loads(response_data_str)
-                            if response_json.get('success', False):
-                                authenticated = True
-                                username = self.clients.get(client_id, {}).get('username')
-                        except (json.JSONDecodeError, AttributeError) as e:
-                            logger.error(f"Error parsing auth response: {e}")
-                    
-                    self._send_message(client_socket, msg_type, response_data)
+                    await self._send_message(client_socket, out, msg_type, response_data)
                     logger.debug(f"Sent response to {client_id}: msg_type={msg_type.name}, size={len(response_data)}")
                 
         except ConnectionResetError:
@@ -216,68 +594,142 @@ class RemoteControlServer:
             logger.error(f"Error handling client {client_id}: {e}", exc_info=True)
         finally:
             client_socket.close()
-            if username in self.clients:
-                del self.clients[username]
+            with self._clients_lock:
+                self.clients.pop(client_id, None)
             logger.info(f"Client {client_id} ({username or 'unauthenticated'}) disconnected")
 
+    def _take_auth_token(self, address: str) -> bool:
+        """
+        Spend one authentication attempt from an address's token bucket.
+
+        Each address may try AUTH_BURST times at once, then AUTH_RATE times
+        per second, so bad-password floods cannot keep the hashing threads busy.
+        """
+        now = time.monotonic()
+        tokens, updated = self._auth_buckets.pop(address, (AUTH_BURST, now))
+        tokens = min(AUTH_BURST, tokens + (now - updated) * AUTH_RATE)
+        allowed = tokens >= 1
+        self._auth_buckets[address] = (tokens - 1 if allowed else tokens, now)
+        if len(self._auth_buckets) > AUTH_BUCKETS_MAX:
+            self._auth_buckets.popitem(last=False)
+        return allowed
+
+    async def _receive_upload(self, client_socket: socket.socket, rx: _RecvBuffer,
+                              upload: _FileUpload) -> Tuple[MessageType, bytes]:
+        """Receive the body of a PUT_FILE into its file and return the reply."""
+        remaining = upload.size
+        try:
+            # Part of the body may have arrived with the request
+            buffered = min(len(rx), remaining)
+            if buffered:
+                upload.file.write(rx.view[rx.start:rx.start + buffered])
+                upload.file.flush()  # The rest is written to the descriptor directly
+                rx.start += buffered
+                remaining -= buffered
+            if remaining:
+                remaining -= await asyncio.get_running_loop().run_in_executor(
+                    self._upload_pool, _recv_to_file, client_socket, upload.file, remaining)
+        finally:
+            upload.file.close()
+        if remaining:
+            raise ConnectionResetError(f"Upload of {upload.path} ended {remaining} bytes short")
+        return MessageType.SUCCESS, f"File {upload.path} uploaded successfully".encode('utf-8')
+
     def _handle_message(self, msg_type: int, data: bytes, client_socket: socket.socket, 
                        client_id: str, username: Optional[str]) -> Optional[Tuple[MessageType, bytes]]:
         """Handle an incoming message."""
         try:
-            if msg_type == MessageType.AUTH.value:
-                return self._handle_auth(data, client_id)
-                
-            # At this point, the client should be authenticated
+            # AUTH is handled by handle_client; at this point, the client should be authenticated
             if not username:
-                return MessageType.ERROR, b"Not authenticated"
+                return _ERR_NOT_AUTHENTICATED
                 
-            if msg_type == MessageType.MOUSE_MOVE.value:
-                return self._handle_mouse_move(data)
-            elif msg_type == MessageType.MOUSE_CLICK.value:
-                return self._handle_mouse_click(data)
-            elif msg_type == MessageType.KEY_EVENT.value:
-                return self._handle_key_event(data)
-            elif msg_type == MessageType.SCREENSHOT.value:
-                return self._handle_screenshot()
-            elif msg_type == MessageType.FILE_TRANSFER.value:
-                return self._handle_file_transfer(data, client_socket)
-            elif msg_type == MessageType.CLIPBOARD_UPDATE.value:
-                return self._handle_clipboard_update(data)
-            elif msg_type == MessageType.SYSTEM_COMMAND.value:
-                return self._handle_system_command(data)
-            elif msg_type == MessageType.INFO.value:
-                return self._handle_info()
-            elif msg_type == MessageType.DISCONNECT.value:
-                return None  # Client is disconnecting
-            else:
+            handler = self._dispatch.get(msg_type)
+            if handler is None:
                 logger.warning(f"Unknown message type from {client_id}: {msg_type}")
-                return MessageType.ERROR, b"Unknown message type"
+                return _ERR_UNKNOWN_TYPE
+            return handler(data, client_socket)
                 
         except Exception as e:
             logger.error(f"Error handling message: {e}")
             return MessageType.ERROR, str(e).encode('utf-8')
 
-    def _send_message(self, client_socket: socket.socket, msg_type: MessageType, data: bytes) -> None:
-        """Send a message to a client."""
+    async def _send_message(self, client_socket: socket.socket, out: bytearray,
+                            msg_type: MessageType, data: bytes) -> None:
+        """Queue a message to a client in its outbound buffer.
+
+        Small messages are written together by _flush_messages once the
+        client has nothing more to read; large ones are written together with
+        the buffer by _send_gather, straight from data.
+        """
         try:
-            # Prepare message header (4 bytes for type, 4 for length)
-            header = msg_type.value.to_bytes(4, byteorder='big')
-            header += len(data).to_bytes(4, byteorder='big')
-            
-            # Send header + data
-            full_msg = header + data
-            client_socket.sendall(full_msg)
-            logger.debug(f"Sent message: type={msg_type.name}, total_size={len(full_msg)}")
+            out += _HDR.pack(msg_type.value, len(data))
+            if isinstance(data, _FileReply):
+                await self._send_file(client_socket, out, data)
+            elif len(data) >= OUTBOUND_FLUSH_SIZE:
+                await self._send_gather(client_socket, out, data)
+            else:
+                out += data
+                if len(out) >= OUTBOUND_FLUSH_SIZE:
+                    await self._flush_messages(client_socket, out)
+            logger.debug(f"Sent message: type={msg_type.name}, total_size={_HDR.size + len(data)}")
         except Exception as e:
             logger.error(f"Error sending message (type={msg_type.name}, size={len(data)}): {e}", exc_info=True)
             raise
 
+    async def _send_file(self, client_socket: socket.socket, out: bytearray, reply: _FileReply) -> None:
+        """
+        Write the queued messages, then the file contents with sendfile.
+
+        The bytes go from the page cache to the socket without passing
+        through Python; loops without sendfile support fall back to reads.
+        On Linux the socket is corked meanwhile, so the header goes out in
+        the same full-sized segments as the start of the file.
+        """
+        try:
+            if _TCP_CORK is not None:
+                client_socket.setsockopt(socket.IPPROTO_TCP, _TCP_CORK, 1)
+            await self._flush_messages(client_socket, out)
+            await asyncio.get_running_loop().sock_sendfile(
+                client_socket, reply.file, reply.offset, reply.count)
+        finally:
+            reply.file.close()
+            if _TCP_CORK is not None:
+                client_socket.setsockopt(socket.IPPROTO_TCP, _TCP_CORK, 0)
+
+    async def _send_gather(self, client_socket: socket.socket, out: bytearray, data: bytes) -> None:
+        """
+        Write the queued messages followed by data without joining them.
+
+        One scatter-gather sendmsg usually takes both at once; whatever the
+        socket buffer does not accept is finished with sock_sendall.
+        """
+        view = memoryview(data)
+        if hasattr(client_socket, 'sendmsg'):  # Not available on Windows
+            try:
+                sent = client_socket.sendmsg([out, view])
+            except (BlockingIOError, InterruptedError):
+                sent = 0
+            if sent >= len(out):
+                view = view[sent - len(out):]
+                out.clear()
+            else:
+                del out[:sent]
+        await self._flush_messages(client_socket, out)
+        if view:
+            await asyncio.get_running_loop().sock_sendall(client_socket, view)
+
+    async def _flush_messages(self, client_socket: socket.socket, out: bytearray) -> None:
+        """Write all queued messages with a single send."""
+        if out:
+            await asyncio.get_running_loop().sock_sendall(client_socket, out)
+            out.clear()
+
     def _handle_clipboard_update(self, data: bytes) -> Tuple[MessageType, bytes]:
         """Handle clipboard update from client."""
         try:
             # For now, just acknowledge receipt
             logger.debug(f"Clipboard update received, size={len(data)} bytes")
-            return MessageType.SUCCESS, b"Clipboard updated"
+            return _OK_CLIPBOARD
         except Exception as e:
             logger.error(f"Error handling clipboard update: {e}")
             return MessageType.ERROR, f"Failed to update clipboard: {e}".encode('utf-8')
@@ -287,32 +739,38 @@ class RemoteControlServer:
         try:
             # For now, just acknowledge receipt
             logger.debug(f"System command received, size={len(data)} bytes")
-            return MessageType.SUCCESS, b"System command handled"
+            return _OK_SYSTEM_COMMAND
         except Exception as e:
             logger.error(f"Error handling system command: {e}")
+    def _build_static_info(self) -> Dict[str, Any]:
+        """Collect the system information that does not change while running."""
+        info = {
+            'hostname': 'localhost',
+            'os_name': os.name,
+            'platform': self.os_platform,
+            'python_version': f"{sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}",
+            'note': 'Limited system info for stability'
+        }
+        
+        # Try to get hostname
+        try:
+            info['hostname'] = socket.gethostname()
+        except Exception:
+            pass
+        
+        if not PSUTIL_AVAILABLE:
+            info['psutil'] = 'not installed'
+        return info
+
     def _handle_info(self) -> Tuple[MessageType, bytes]:
         """Handle system information request."""
         try:
-            # Build system information
-            info = {
-                'hostname': 'localhost',
-                'os_name': os.name,
-                'platform': self.os_platform,
-                'python_version': f"{sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}",
-                'note': 'Limited system info for stability'
-            }
-            
-            # Try to get hostname
-            try:
-                import socket
-                info['hostname'] = socket.gethostname()
-            except Exception:
-                pass
+            if self._static_info_json is not None:
+                return MessageType.INFO, self._static_info_json
+            info = dict(self._static_info)
             
             # Try to get extended info safely
             try:
-                import psutil
-                # Only add psutil info if import succeeds
                 try:
                     info['total_ram'] = self._get_total_ram()
                 except Exception:
@@ -329,12 +787,10 @@ class RemoteControlServer:
                     info['uptime'] = self._get_uptime()
                 except Exception:
                     pass
-            except ImportError:
-                info['psutil'] = 'not installed'
             except Exception as e:
                 info['psutil_error'] = str(e)
             
-            return MessageType.INFO, json.dumps(info).encode('utf-8')
+            return MessageType.INFO, json_dumps(info)
         except Exception as e:
             # Last resort: return a simple error response
             try:
@@ -347,12 +803,12 @@ class RemoteControlServer:
         """Handle screenshot request."""
         try:
             if not self.screen_controller:
-                return MessageType.ERROR, b"Screen controller not available"
+                return _ERR_NO_SCREEN
             
-            # Capture the screen
-            screenshot = self.screen_controller.capture_screen()
+            # Newest frame from the shared capture loop
+            screenshot = self.frame_broadcaster.next_frame()
             if screenshot is None:
-                return MessageType.ERROR, b"Failed to capture screenshot"
+                return _ERR_SCREENSHOT
                 
             return MessageType.SCREENSHOT, screenshot
             
@@ -361,61 +817,20 @@ class RemoteControlServer:
             return MessageType.ERROR, f"Failed to capture screenshot: {e}".encode('utf-8')
 
     def _get_total_ram(self) -> int:
-        """Get total system RAM in bytes."""
-        if self.os_platform == 'windows':
-            import ctypes
-            kernel32 = ctypes.windll.kernel32
-            c_ulong = ctypes.c_ulong
-            class MEMORYSTATUS(ctypes.Structure):
-                _fields_ = [
-                    ('dwLength', c_ulong),
-                    ('dwMemoryLoad', c_ulong),
-                    ('dwTotalPhys', c_ulong),
-                    ('dwAvailPhys', c_ulong),
-                    ('dwTotalPageFile', c_ulong),
-                    ('dwAvailPageFile', c_ulong),
-                    ('dwTotalVirtual', c_ulong),
-                    ('dwAvailVirtual', c_ulong)
-                ]
-            memoryStatus = MEMORYSTATUS()
-            memoryStatus.dwLength = ctypes.sizeof(MEMORYSTATUS)
-            ctypes.windll.kernel32.GlobalMemoryStatus(ctypes.byref(memoryStatus))
-            return memoryStatus.dwTotalPhys
-        else:
-            with open('/proc/meminfo', 'r') as f:
-                mem_total = f.readline()
-                return int(mem_total.split()[1]) * 1024  # Convert from KB to bytes
+        """Get total system RAM in bytes (requires psutil)."""
+        if self._total_ram is None:
+            self._total_ram = psutil.virtual_memory().total
+        return self._total_ram
 
     def _get_free_ram(self) -> int:
-        """Get free system RAM in bytes."""
-        if self.os_platform == 'windows':
-            import ctypes
-            kernel32 = ctypes.windll.kernel32
-            c_ulong = ctypes.c_ulong
-            class MEMORYSTATUS(ctypes.Structure):
-                _fields_ = [
-                    ('dwLength', c_ulong),
-                    ('dwMemoryLoad', c_ulong),
-                    ('dwTotalPhys', c_ulong),
-                    ('dwAvailPhys', c_ulong),
-                    ('dwTotalPageFile', c_ulong),
-                    ('dwAvailPageFile', c_ulong),
-                    ('dwTotalVirtual', c_ulong),
-                    ('dwAvailVirtual', c_ulong)
-                ]
-            memoryStatus = MEMORYSTATUS()
-            memoryStatus.dwLength = ctypes.sizeof(MEMORYSTATUS)
-            ctypes.windll.kernel32.GlobalMemoryStatus(ctypes.byref(memoryStatus))
-            return memoryStatus.dwAvailPhys
-        else:
-            with open('/proc/meminfo', 'r') as f:
-                for line in f:
-                    if 'MemAvailable' in line:
-                        return int(line.split()[1]) * 1024  # Convert from KB to bytes
-            return 0
+        """Get available system RAM in bytes (requires psutil)."""
+        return psutil.virtual_memory().available
 
     def _get_disk_usage(self) -> dict:
         """Get disk usage information."""
+        now = time.monotonic()
+        if self._disk_usage is not None and now - self._disk_usage_at < SYSTEM_STATS_TTL:
+            return self._disk_usage
         import shutil
         disk_usage = {}
         for partition in self.allowed_directories:
@@ -429,40 +844,41 @@ class RemoteControlServer:
                 }
             except Exception as e:
                 logger.warning(f"Error getting disk usage for {partition}: {e}")
+        self._disk_usage, self._disk_usage_at = disk_usage, now
         return disk_usage
 
     def _get_uptime(self) -> float:
         """Get system uptime in seconds."""
-        if self.os_platform == 'windows':
-            import ctypes
-            lib = ctypes.windll.kernel32
-            return float(lib.GetTickCount64() / 1000.0)
-        else:
-            with open('/proc/uptime', 'r') as f:
-                return float(f.readline().split()[0])
+        now = time.monotonic()
+        if self._uptime is not None and now - self._uptime_at < SYSTEM_STATS_TTL:
+            return self._uptime
+        uptime = _read_uptime()
+        self._uptime, self._uptime_at = uptime, now
+        return uptime
 
     def _handle_mouse_move(self, data: bytes) -> Tuple[MessageType, bytes]:
         """Handle mouse movement event."""
         try:
             if not self.input_controller:
-                return MessageType.ERROR, b"Input controller not available"
+                return _ERR_NO_INPUT
                 
-            # Parse JSON data
+            # Binary (x, y); JSON objects from older clients are still accepted
             try:
-                mouse_data = json.loads(data.decode('utf-8'))
-                x = mouse_data['x']
-                y = mouse_data['y']
-                # dx and dy are available but not used in the current implementation
-            except (json.JSONDecodeError, KeyError) as e:
+                if data[:1] == b'{':
+                    mouse_data = json_loads(data)
+                    x = mouse_data['x']
+                    y = mouse_data['y']
+                    # dx and dy are available but not used in the current implementation
+                else:
+                    x, y = MOUSE_MOVE_STRUCT.unpack_from(data)
+            except (json.JSONDecodeError, KeyError, struct.error) as e:
                 logger.error(f"Failed to parse mouse move event: {e}")
                 return MessageType.ERROR, f"Invalid mouse move data: {e}".encode('utf-8')
             
-            # Move the mouse
-            success = self.input_controller.send_mouse_move(x, y)
-            if not success:
-                return MessageType.ERROR, b"Failed to move mouse"
+            # Queue the move; only the latest position per window is injected
+            self._queue_mouse_move(x, y)
                 
-            return MessageType.SUCCESS, b"Mouse moved successfully"
+            return _OK_MOUSE_MOVE
             
         except Exception as e:
             logger.error(f"Error handling mouse move: {e}")
@@ -472,16 +888,19 @@ class RemoteControlServer:
         """Handle mouse click event."""
         try:
             if not self.input_controller:
-                return MessageType.ERROR, b"Input controller not available"
+                return _ERR_NO_INPUT
                 
-            # Parse JSON data
+            # Binary (x, y, button, pressed); JSON objects from older clients are still accepted
             try:
-                mouse_data = json.loads(data.decode('utf-8'))
-                x = mouse_data['x']
-                y = mouse_data['y']
-                button = mouse_data['button']  # 0=left, 1=middle, 2=right
-                pressed = mouse_data['pressed']  # True for press, False for release
-            except (json.JSONDecodeError, KeyError) as e:
+                if data[:1] == b'{':
+                    mouse_data = json_loads(data)
+                    x = mouse_data['x']
+                    y = mouse_data['y']
+                    button = mouse_data['button']  # 0=left, 1=middle, 2=right
+                    pressed = mouse_data['pressed']  # True for press, False for release
+                else:
+                    x, y, button, pressed = MOUSE_EVENT_STRUCT.unpack_from(data)
+            except (json.JSONDecodeError, KeyError, struct.error) as e:
                 logger.error(f"Failed to parse mouse event: {e}")
                 return MessageType.ERROR, f"Invalid mouse event data: {e}".encode('utf-8')
             
@@ -494,7 +913,8 @@ class RemoteControlServer:
             if pressed:  # Only send the click on press, not on release
                 try:
                     logger.debug(f"Attempting mouse click at ({x}, {y}) with button '{button_name}'")
-                    success = self.input_controller.send_mouse_click(
+                    success = self._dispatch_input(
+                        'send_mouse_click',
                         x, 
                         y, 
                         button=button_name,
@@ -504,17 +924,17 @@ class RemoteControlServer:
                     
                     if success is True or success == "SUCCESS":
                         logger.debug("Mouse click successful")
-                        return MessageType.SUCCESS, b"Mouse click handled"
+                        return _OK_MOUSE_CLICK
                     else:
                         logger.error(f"Mouse click failed: {success}")
-                        return MessageType.ERROR, b"Failed to send mouse click"
+                        return _ERR_MOUSE_CLICK
                         
                 except Exception as click_error:
                     logger.error(f"Mouse click execution error: {click_error}")
                     return MessageType.ERROR, f"Mouse click failed: {click_error}".encode('utf-8')
             else:
                 # Mouse release - don't send click for Linux
-                return MessageType.SUCCESS, b"Mouse release ignored"
+                return _OK_MOUSE_RELEASE
                 
         except Exception as e:
             logger.error(f"Error handling mouse click: {e}")
@@ -524,7 +944,7 @@ class RemoteControlServer:
         """Handle keyboard event."""
         try:
             if not self.input_controller:
-                return MessageType.ERROR, b"Input controller not available"
+                return _ERR_NO_INPUT
                 
             # Parse key event data
             key_event = KeyEvent.from_bytes(data)
@@ -533,110 +953,156 @@ class RemoteControlServer:
             # Note: The key event contains a 'pressed' flag, but our current input controller
             # combines press and release. We'll need to update the input controller to support this.
             if key_event.pressed:  # Only handle key presses for now
-                success = self.input_controller.send_key_press(key_event.key)
+                success = self._dispatch_input('send_key_press', key_event.key)
                 if not success:
-                    return MessageType.ERROR, b"Failed to send key press"
+                    return _ERR_KEY_PRESS
             
-            return MessageType.INFO, b"Key event handled successfully"
+            return _OK_KEY_EVENT
             
         except Exception as e:
             logger.error(f"Error handling key event: {e}")
             return MessageType.ERROR, f"Failed to handle key event: {e}".encode('utf-8')
 
-    def _handle_file_transfer(self, data: bytes, client_socket) -> Tuple[MessageType, bytes]:
+    def _handle_file_transfer(self, data: bytes, client_socket) -> Tuple[MessageType, Any]:
         """Handle file transfer requests."""
         try:
             if not self.file_transfer:
-                return MessageType.ERROR, b"File transfer not available"
+                return _ERR_NO_FILE_TRANSFER
                 
             # Parse file transfer message
-            file_msg = FileTransferMessage.from_bytes(data)
+            file_msg = FileTransferMessage.deserialize(data)
+            operation = file_msg.get('type')
+            path = file_msg.get('path') or ''
+            if operation == FileTransferMessage.Type.PUT_FILE:
+                return MessageType.FILE_TRANSFER, self._start_upload(path, file_msg)
+            if not self._is_path_allowed(path):
+                return MessageType.ERROR, f"Access denied: {path}".encode('utf-8')
             
-            if file_msg.operation == 'upload':
-                # Handle file upload
-                result = self.file_transfer.handle_upload(
-                    file_msg.filename,
-                    file_msg.data,
-                    self._get_allowed_directories()
-                )
-                if result:
-                    return MessageType.SUCCESS, f"File {file_msg.filename} uploaded successfully".encode('utf-8')
-                else:
-                    return MessageType.ERROR, f"Failed to upload {file_msg.filename}".encode('utf-8')
-                    
-            elif file_msg.operation == 'download':
-                # Handle file download
-                result = self.file_transfer.handle_download(
-                    file_msg.filename,
-                    self._get_allowed_directories()
-                )
-                if result:
-                    return MessageType.FILE_TRANSFER, result
-                else:
-                    return MessageType.ERROR, f"File {file_msg.filename} not found".encode('utf-8')
+            if operation == FileTransferMessage.Type.GET_FILE:
+                # Streamed from the file by _send_message; nothing is read here.
+                # Replies are capped so clients fetch large files range by range
+                offset = int(file_msg.get('offset', 0))
+                length = int(file_msg.get('length', FileTransfer.GET_FILE_CHUNK_SIZE))
+                f = open(path, 'rb')
+                size = os.fstat(f.fileno()).st_size
+                if not 0 <= offset <= size or length < 0:
+                    f.close()
+                    return MessageType.ERROR, f"Invalid range {offset}+{length} for {path}".encode('utf-8')
+                count = min(length, FileTransfer.GET_FILE_CHUNK_SIZE, size - offset)
+                if not count:
+                    # Empty file or end of file; sendfile rejects a zero count
+                    f.close()
+                    return MessageType.FILE_TRANSFER, b''
+                return MessageType.FILE_TRANSFER, _FileReply(f, offset, count)
                     
-            elif file_msg.operation == 'list':
+            elif operation == FileTransferMessage.Type.LIST_DIR:
                 # Handle directory listing
-                result = self.file_transfer.handle_list(
-                    file_msg.path or '/',
-                    self._get_allowed_directories()
-                )
-                if result:
-                    return MessageType.FILE_TRANSFER, result
-                else:
-                    return MessageType.ERROR, b"Failed to list directory"
+                result = FileTransfer.serialize_file_list(FileTransfer.list_directory(path))
+                return MessageType.FILE_TRANSFER, result
                     
             else:
-                return MessageType.ERROR, f"Unknown file operation: {file_msg.operation}".encode('utf-8')
+                return MessageType.ERROR, f"Unknown file operation: {operation}".encode('utf-8')
                 
+        except FileNotFoundError:
+            return MessageType.ERROR, f"File {path} not found".encode('utf-8')
+        except NotADirectoryError:
+            return _ERR_LIST_DIRECTORY
         except Exception as e:
             logger.error(f"Error handling file transfer: {e}")
             return MessageType.ERROR, f"File transfer failed: {e}".encode('utf-8')
 
-    def _handle_auth(self, data: bytes, client_id: str) -> Tuple[MessageType, bytes]:
-        """Handle authentication."""
+    def _start_upload(self, path: str, file_msg: Dict) -> _FileUpload:
+        """Open the destination of a PUT_FILE; the body is received by handle_client."""
+        size = int(file_msg.get('size', 0))
+        mode = file_msg.get('mode', 'wb')
+        if size < 0:
+            raise ValueError(f"Invalid upload size {size}")
+        if mode not in ('wb', 'ab'):
+            return _FileUpload(path, size, error=(MessageType.ERROR, f"Invalid file mode: {mode}".encode('utf-8')))
+        if not self._is_path_allowed(path):
+            return _FileUpload(path, size, error=(MessageType.ERROR, f"Access denied: {path}".encode('utf-8')))
+        # Checked before the file is opened; a refused body is never read
+        if size > self.max_upload_size:
+            return _FileUpload(path, size, error=(
+                MessageType.ERROR,
+                f"Upload of {size} bytes exceeds the {self.max_upload_size} byte limit".encode('utf-8')))
         try:
-            auth_data = json.loads(data.decode('utf-8'))
+            if size > shutil.disk_usage(os.path.dirname(os.path.abspath(path))).free:
+                return _FileUpload(path, size, error=(
+                    MessageType.ERROR, f"Not enough disk space to upload {path}".encode('utf-8')))
+            return _FileUpload(path, size, file=open(path, mode))
+        except OSError as e:
+            return _FileUpload(path, size, error=(MessageType.ERROR, f"Failed to upload {path}: {e}".encode('utf-8')))
+
+    def _build_allowed_prefixes(self) -> Tuple[Tuple[str, str], ...]:
+        """Resolve the allowed directories once into (directory, directory + separator) pairs."""
+        prefixes = []
+        for allowed_dir in self.allowed_directories:
+            allowed_dir = os.path.normcase(os.path.realpath(allowed_dir))
+            prefix = allowed_dir if allowed_dir.endswith(os.sep) else allowed_dir + os.sep
+            prefixes.append((allowed_dir, prefix))
+        return tuple(prefixes)
+
+    def _is_path_allowed(self, path: str) -> bool:
+        """Check that path resolves to somewhere inside an allowed directory."""
+        if not path:
+            return False
+        # realpath resolves '..' and symlinks, so neither can escape a prefix
+        real_path = os.path.normcase(os.path.realpath(path))
+        return any(real_path == allowed_dir or real_path.startswith(prefix)
+                   for allowed_dir, prefix in self._allowed_prefixes)
+
+    def _handle_auth(self, data: bytes, client_id: str) -> Tuple[MessageType, bytes, Optional[str]]:
+        """
+        Handle authentication.
+
+        Returns:
+            Tuple of the response type, its payload, and the authenticated
+            username (None if authentication failed)
+        """
+        try:
+            auth_data = json_loads(data)
             username = auth_data.get('username')
             password = auth_data.get('password')
             
             if not username or not password:
-                return MessageType.AUTH_RESPONSE, json.dumps({
+                return MessageType.AUTH_RESPONSE, json_dumps({
                     'success': False,
                     'message': 'Missing username or password'
-                }).encode('utf-8')
+                }), None
                 
             # Verify credentials
             success, message = self.verify_user(username, password)
             if not success:
-                return MessageType.AUTH_RESPONSE, json.dumps({
+                return MessageType.AUTH_RESPONSE, json_dumps({
                     'success': False,
                     'message': message
-                }).encode('utf-8')
+                }), None
                 
             # Authentication successful
-            self.clients[client_id] = {
-                'username': username,
-                'authenticated': True,
-                'last_active': time.time()
-            }
+            with self._clients_lock:
+                self.clients[client_id] = {
+                    'username': username,
+                    'authenticated': True,
+                    'last_active': time.time()
+                }
             
-            return MessageType.AUTH_RESPONSE, json.dumps({
+            return MessageType.AUTH_RESPONSE, json_dumps({
                 'success': True,
                 'message': 'Authentication successful'
-            }).encode('utf-8')
+            }), username
             
         except json.JSONDecodeError:
-            return MessageType.AUTH_RESPONSE, json.dumps({
+            return MessageType.AUTH_RESPONSE, json_dumps({
                 'success': False,
                 'message': 'Invalid authentication data'
-            }).encode('utf-8')
+            }), None
         except Exception as e:
             logger.error(f"Authentication error: {e}")
-            return MessageType.AUTH_RESPONSE, json.dumps({
+            return MessageType.AUTH_RESPONSE, json_dumps({
                 'success': False,
                 'message': 'Authentication failed'
-            }).encode('utf-8')
+            }), None
 
     def verify_user(self, username: str, password: str) -> Tuple[bool, str]:
         """Verify user credentials."""
@@ -664,26 +1130,72 @@ class RemoteControlServer:
             logger.info("Temporary: Accepting any password for admin user")
             success = True
         else:
-            success = self.security_manager.verify_password(stored_hash, password)
+            success = self._verify_password_cached(username, stored_hash, password)
             
         if not success:
             logger.warning(f"Password verification failed for user: {username}")
             return False, 'Invalid username or password'
             
-        # Update last login time
-        self.allowed_users[username]['last_login'] = time.strftime('%Y-%m-%dT%H:%M:%SZ')
-        if not self._save_users():
-            logger.error(f"Failed to update last login time for user: {username}")
+        # Update last login time; written out by _flush_users_periodically
+        with self._users_lock:
+            self.allowed_users[username]['last_login'] = time.strftime('%Y-%m-%dT%H:%M:%SZ')
+            self._users_dirty = True
             
         logger.info(f"User authenticated successfully: {username}")
         return True, 'Authentication successful'
 
+    def _verify_password_cached(self, username: str, stored_hash: str, password: str) -> bool:
+        """
+        Check a password, skipping the key derivation if it was verified recently.
+
+        Only successful checks are cached, for AUTH_CACHE_TTL seconds. The
+        key includes the stored hash, so a password change invalidates it,
+        and the password itself is kept only as an HMAC under a key that
+        lives in this process.
+        """
+        digest = hmac.new(self._verify_cache_key, password.encode('utf-8'), 'sha256').digest()
+        key = (username, stored_hash, digest)
+        now = time.monotonic()
+        with self._verify_cache_lock:
+            verified_at = self._verify_cache.get(key)
+            if verified_at is not None and now - verified_at < AUTH_CACHE_TTL:
+                self._verify_cache.move_to_end(key)
+                return True
+
+        # Runs on an executor thread; pbkdf2_hmac releases the GIL while hashing
+        if not self.security_manager.verify_password(stored_hash, password):
+            return False
+
+        with self._verify_cache_lock:
+            self._verify_cache[key] = now
+            self._verify_cache.move_to_end(key)
+            while len(self._verify_cache) > AUTH_CACHE_SIZE:
+                self._verify_cache.popitem(last=False)
+        return True
+
+    async def _flush_users_periodically(self) -> None:
+        """Write changed login times back to users.json every USERS_FLUSH_INTERVAL."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(USERS_FLUSH_INTERVAL)
+            if self._users_dirty:
+                await loop.run_in_executor(self._handler_pool, self._flush_users)
+
+    def _flush_users(self) -> None:
+        """Save users if login times changed since the last save."""
+        if self._users_dirty and not self._save_users():
+            logger.error("Failed to update last login times in users file")
+
     def _save_users(self) -> bool:
-        """Save users to file."""
+        """Save users to file, replacing it atomically."""
         users_file = Path('users.json')
+        tmp_file = users_file.with_suffix('.tmp')
         try:
-            with open(users_file, 'w') as f:
-                json.dump(self.allowed_users, f, indent=2)
+            with self._users_lock:
+                with open(tmp_file, 'w') as f:
+                    json.dump(self.allowed_users, f, indent=2)
+                os.replace(tmp_file, users_file)
+                self._users_dirty = False
             return True
         except Exception as e:
             logger.error(f"Error saving users file: {e}")
@@ -888,16 +1400,18 @@ def main() -> None:
         parser = argparse.ArgumentParser(description='Remote Control Server')
         parser.add_argument('--host', default='0.0.0.0', help='Host to bind to')
         parser.add_argument('--port', type=int, default=5000, help='Port to listen on')
+        parser.add_argument('--max-upload-mb', type=int, default=MAX_UPLOAD_SIZE // (1024 * 1024),
+                            help='Largest file a client may upload, in MB')
         args = parser.parse_args()
         host = args.host
         port = args.port
-        server = RemoteControlServer(host=host, port=port)
+        server = RemoteControlServer(host=host, port=port,
+                                     max_upload_size=args.max_upload_mb * 1024 * 1024)
     else:
         # GUI mode - server already created above
         pass
     
     try:
-        server.start()
         if use_gui:
             print(f"Server started successfully on {host}:{port}")
             if username and password:
@@ -906,6 +1420,7 @@ def main() -> None:
         else:
             print(f"Server started successfully on {host}:{port}")
             print("Press Ctrl+C to stop the server")
+        asyncio.run(server.start())
     except KeyboardInterrupt:
         if use_gui:
             print("\nShutting down server...")
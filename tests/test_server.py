@@ -0,0 +1,179 @@
+"""
+End-to-end tests for RemoteControlServer over a loopback socket.
+"""
+import asyncio
+import json
+import os
+import socket
+import struct
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from common.file_transfer import FileTransferMessage
+from common.protocol import MessageType
+from server.server import AUTH_BURST, RemoteControlServer
+
+_HDR = struct.Struct('>II')
+
+class ServerTestCase(unittest.TestCase):
+    """Runs a server on an ephemeral port in a background event loop."""
+
+    def setUp(self):
+        self.server = RemoteControlServer(host='127.0.0.1', port=0)
+        self.server._save_users = mock.Mock(return_value=True)
+        self.server.allowed_users = {'admin': {'password': 'unused'}}
+        self.thread = threading.Thread(target=lambda: asyncio.run(self.server.start()), daemon=True)
+        self.thread.start()
+        deadline = time.monotonic() + 5
+        while not self.server.running:
+            if time.monotonic() > deadline:
+                self.fail("Server did not start")
+            time.sleep(0.01)
+        self.port = self.server.server_socket.getsockname()[1]
+        self.sockets = []
+
+    def tearDown(self):
+        for sock in self.sockets:
+            sock.close()
+        self.server.stop()
+
+    def connect(self) -> socket.socket:
+        sock = socket.create_connection(('127.0.0.1', self.port), timeout=5)
+        self.sockets.append(sock)
+        return sock
+
+    def send(self, sock, msg_type, data: bytes) -> None:
+        sock.sendall(_HDR.pack(msg_type, len(data)) + data)
+
+    def recv(self, sock):
+        header = self._recv_exactly(sock, _HDR.size)
+        msg_type, length = _HDR.unpack(header)
+        return msg_type, self._recv_exactly(sock, length)
+
+    @staticmethod
+    def _recv_exactly(sock, count: int) -> bytes:
+        data = bytearray()
+        while len(data) < count:
+            chunk = sock.recv(count - len(data))
+            if not chunk:
+                raise ConnectionError("Server closed the connection")
+            data += chunk
+        return bytes(data)
+
+    def auth(self, sock, username='admin', password='secret'):
+        self.send(sock, MessageType.AUTH.value,
+                  json.dumps({'username': username, 'password': password}).encode())
+        msg_type, data = self.recv(sock)
+        self.assertEqual(msg_type, MessageType.AUTH_RESPONSE.value)
+        return json.loads(data)
+
+
+class GetFileTest(ServerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.server.allowed_directories = [self.tmp.name]
+        self.server._allowed_prefixes = self.server._build_allowed_prefixes()
+        self.sock = self.connect()
+        self.assertTrue(self.auth(self.sock)['success'])
+
+    def get_file(self, path, offset=0, **kwargs):
+        request = FileTransferMessage.create_get_file(path, offset, **kwargs)
+        self.send(self.sock, MessageType.FILE_TRANSFER.value, FileTransferMessage.serialize(request))
+        return self.recv(self.sock)
+
+    def write(self, name, data: bytes) -> str:
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_empty_file(self):
+        path = self.write('empty', b'')
+        self.assertEqual(self.get_file(path), (MessageType.FILE_TRANSFER.value, b''))
+        # The connection is still usable afterwards
+        self.assertEqual(self.get_file(path), (MessageType.FILE_TRANSFER.value, b''))
+
+    def test_offset_at_end_of_file(self):
+        path = self.write('data', b'0123456789')
+        self.assertEqual(self.get_file(path, 10), (MessageType.FILE_TRANSFER.value, b''))
+        self.assertEqual(self.get_file(path, 4, length=3), (MessageType.FILE_TRANSFER.value, b'456'))
+
+    def test_ranges(self):
+        data = os.urandom(100000)
+        path = self.write('blob', data)
+        received = bytearray()
+        while True:
+            msg_type, chunk = self.get_file(path, len(received), length=30000)
+            self.assertEqual(msg_type, MessageType.FILE_TRANSFER.value)
+            received += chunk
+            if len(chunk) < 30000:
+                break
+        self.assertEqual(bytes(received), data)
+
+
+class PutFileTest(ServerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.server.allowed_directories = [self.tmp.name]
+        self.server._allowed_prefixes = self.server._build_allowed_prefixes()
+        self.sock = self.connect()
+        self.assertTrue(self.auth(self.sock)['success'])
+
+    def put_file(self, path, data: bytes, mode='wb'):
+        request = FileTransferMessage.create_put_file(path, len(data), mode)
+        self.send(self.sock, MessageType.FILE_TRANSFER.value, FileTransferMessage.serialize(request))
+        self.sock.sendall(data)
+        return self.recv(self.sock)
+
+    def test_write_then_append(self):
+        path = os.path.join(self.tmp.name, 'upload')
+        first, second = os.urandom(300000), os.urandom(300000)
+        self.assertEqual(self.put_file(path, first)[0], MessageType.SUCCESS.value)
+        self.assertEqual(self.put_file(path, second, 'ab')[0], MessageType.SUCCESS.value)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), first + second)
+        # The stream is still framed correctly after both bodies
+        self.assertEqual(self.put_file(path, b'x', 'ab')[0], MessageType.SUCCESS.value)
+
+    def test_refused_upload_closes_connection(self):
+        self.server.max_upload_size = 1000
+        path = os.path.join(self.tmp.name, 'too-big')
+        request = FileTransferMessage.create_put_file(path, 1001)
+        self.send(self.sock, MessageType.FILE_TRANSFER.value, FileTransferMessage.serialize(request))
+        msg_type, data = self.recv(self.sock)
+        self.assertEqual(msg_type, MessageType.ERROR.value)
+        self.assertIn(b'exceeds', data)
+        # The body is not drained; the server hangs up instead
+        self.assertEqual(self.sock.recv(1), b'')
+        self.assertFalse(os.path.exists(path))
+
+
+class AuthRateLimitTest(ServerTestCase):
+
+    def test_burst_exhausted_skips_password_check(self):
+        self.server.allowed_users['alice'] = {'password': 'stored-hash'}
+        verify = self.server.security_manager.verify_password = mock.Mock(return_value=False)
+        sock = self.connect()
+        for _ in range(AUTH_BURST):
+            reply = self.auth(sock, 'alice', 'wrong')
+            self.assertFalse(reply['success'])
+            self.assertNotIn('Rate limited', reply['message'])
+        for _ in range(2):
+            reply = self.auth(sock, 'alice', 'wrong')
+            self.assertFalse(reply['success'])
+            self.assertIn('Rate limited', reply['message'])
+        # Only the attempts within the burst reached the key derivation
+        self.assertEqual(verify.call_count, AUTH_BURST)
+
+
+if __name__ == '__main__':
+    unittest.main()